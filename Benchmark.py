@@ -0,0 +1,343 @@
+from MockServer import MockServer, KemonoPost, Rule34Post, E621Post, AddArguments, ConfigFrom, Environment, Serve
+from Parser import Loads, Dumps, Project, Projections
+from Writer import Writer
+from Rclone import Daemon
+from rich.console import Console
+from rich.table import Table
+from pathlib import Path
+import argparse
+import hashlib
+import subprocess
+import tracemalloc
+import threading
+import tempfile
+import asyncio
+import random
+import statistics
+import shutil
+import json
+import time
+import sys
+import os
+
+Root = Path(__file__).resolve().parent
+PayloadDir = Path('Data/Payloads')
+Targets = {
+	'fetcher': ('Fetcher.py', lambda Config: ['Data/Files']),
+	'main': ('Main.py', lambda Config: list(Config['directory_names'].values()))
+}
+Modules = ['Fetcher', 'Main', 'Network', 'Writer', 'Cache', 'Rclone', 'Packer', 'Proxies', 'Parser', 'Metrics', 'Profiler']
+Fields = {'kemono': 'path', 'coomer': 'path', 'rule34': 'file_url', 'e621': 'file.url'}
+Console = Console(force_terminal=True)
+
+def Sha256(Seed: str) -> str:
+	return hashlib.sha256(Seed.encode()).hexdigest()
+
+def Md5(Seed: str) -> str:
+	return hashlib.md5(Seed.encode()).hexdigest()
+
+def KemonoPath(Seed: str, Extension: str) -> str:
+	return f'/{Sha256(Seed)[:2]}/{Sha256(Seed)[2:4]}/{Sha256(Seed)}{Extension}'
+
+def KemonoPage(Creator: str = 'creator', Offset: int = 0, Count: int = 50, Attachments: int = 3) -> list:
+	return [
+		KemonoPost(Index, Creator, 'patreon', KemonoPath(f'{Creator}{Index}', '.jpg'), [KemonoPath(f'{Creator}{Index}-{Number}', '.png') for Number in range(Attachments)])
+		for Index in range(Offset, Offset + Count)
+	]
+
+def Rule34Page(Tag: str = 'tag', Page: int = 0, Count: int = 1000) -> list:
+	return [Rule34Post(Index, 'https://api-cdn.rule34.xxx', f'{Md5(f"{Tag}{Index}")}.jpeg') for Index in range(Page * Count, (Page + 1) * Count)]
+
+def E621Page(Tag: str = 'tag', Page: int = 1, Count: int = 320) -> dict:
+	return {'posts': [E621Post(Index, 'https://static1.e621.net', f'{Md5(f"{Tag}{Index}")}.png', 1048576) for Index in range((Page - 1) * Count, Page * Count)]}
+
+def LoadPayloads() -> dict:
+	Payloads = {File.stem: File.read_bytes() for File in sorted(PayloadDir.glob('*.json'))} if PayloadDir.exists() else {}
+	return Payloads or {
+		'kemono': json.dumps(KemonoPage()).encode(),
+		'rule34': json.dumps(Rule34Page()).replace('/', '\\/').encode(),
+		'e621': json.dumps(E621Page()).encode()
+	}
+
+def Measure(Function, Rounds: int) -> float:
+	Start = time.perf_counter()
+	for _ in range(Rounds):
+		Function()
+	return (time.perf_counter() - Start) / Rounds
+
+def BenchmarkJson(Rounds: int) -> None:
+	Payloads = LoadPayloads()
+	Results = Table('Payload', 'Size', 'json (str)', 'orjson (bytes)', 'Speedup', 'json.dumps', 'Dumps', 'Speedup', title='JSON Decode / Encode')
+	for Name, Raw in Payloads.items():
+		Decoded = Loads(Raw)
+		Stdlib = Measure(lambda: json.loads(Raw.decode()), Rounds)
+		Fast = Measure(lambda: Loads(Raw), Rounds)
+		StdlibDump = Measure(lambda: json.dumps(Decoded, indent=4), Rounds)
+		FastDump = Measure(lambda: Dumps(Decoded, Indent=True), Rounds)
+		Results.add_row(
+			Name, f'{len(Raw) / 1024:.0f} KB',
+			f'{Stdlib * 1e3:.2f} ms', f'{Fast * 1e3:.2f} ms', f'{Stdlib / Fast:.1f}x',
+			f'{StdlibDump * 1e3:.2f} ms', f'{FastDump * 1e3:.2f} ms', f'{StdlibDump / FastDump:.1f}x'
+		)
+	Console.print(Results)
+
+def Walk(Data, Field: str) -> list:
+	if Field == 'path':
+		return [Item['path'] for Post in Data for Item in [Post.get('file') or {}] + Post.get('attachments', []) if Item.get('path')]
+	if Field == 'file_url':
+		return [Post['file_url'] for Post in Data if Post.get('file_url')]
+	return [Post['file']['url'] for Post in Data['posts'] if Post.get('file', {}).get('url')]
+
+def PeakMemory(Function) -> int:
+	tracemalloc.start()
+	Function()
+	Peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return Peak
+
+def BenchmarkProjection(Rounds: int) -> None:
+	Payloads = LoadPayloads()
+	Results = Table('Payload', 'Files', 'Full Decode', 'Projected', 'Speedup', 'Full Peak', 'Projected Peak', title='Projected Extraction')
+	for Name, Raw in Payloads.items():
+		Field = Fields.get(Name.split('-')[0], 'path')
+		if Field not in Projections:
+			continue
+		Full = Measure(lambda: Walk(Loads(Raw), Field), Rounds)
+		Projected = Measure(lambda: Project(Raw, Field), Rounds)
+		Results.add_row(
+			Name, str(len(Project(Raw, Field))),
+			f'{Full * 1e3:.2f} ms', f'{Projected * 1e3:.2f} ms', f'{Full / Projected:.1f}x',
+			f'{PeakMemory(lambda: Walk(Loads(Raw), Field)) / 1024:.0f} KB', f'{PeakMemory(lambda: Project(Raw, Field)) / 1024:.0f} KB'
+		)
+	Console.print(Results)
+
+def RunTarget(Target: str, Base: str, Timeout: float, Arguments: list = (), State: Path = None) -> dict:
+	Script, Outputs = Targets[Target]
+	with tempfile.TemporaryDirectory(prefix=f'neofans-{Target}-') as Workdir:
+		shutil.copy(Root / 'config.json', Workdir)
+		Environ = {**os.environ, **Environment(Base), 'COLUMNS': '120', 'COOMER_SESS': 'benchmark', 'KEMONO_SESS': 'benchmark'}
+		Start = time.perf_counter()
+		Process = subprocess.Popen([sys.executable, str(Root / Script), *Arguments], cwd=Workdir, env=Environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		Timer = threading.Timer(Timeout, Process.terminate)
+		Timer.start()
+		_, Status, Usage = os.wait4(Process.pid, 0)
+		Timer.cancel()
+		Process.returncode = os.waitstatus_to_exitcode(Status)
+		Elapsed = time.perf_counter() - Start
+		Files = [
+			File for Output in Outputs(Loads((Root / 'config.json').read_bytes()))
+			for File in (Path(Workdir) / Output).rglob('*') if File.is_file() and File.suffix != '.partial'
+		]
+		if State:
+			for File in (Path(Workdir) / 'Data/State').glob('Shard*.json'):
+				shutil.copy(File, State)
+		return {
+			'Names': {File.stem for File in Files},
+			'Exit': Process.returncode,
+			'Files': len(Files),
+			'Bytes': sum(File.stat().st_size for File in Files),
+			'Seconds': Elapsed,
+			'PeakRss': Usage.ru_maxrss * 1024
+		}
+
+async def BenchmarkEndToEnd(Args) -> None:
+	Server = MockServer(ConfigFrom(Args))
+	Runner, Base = await Serve(Server)
+	Results = Table('Target', 'Exit', 'Files', 'MB', 'Seconds', 'Files/s', 'MB/s', 'Requests', 'Errors', 'p50', 'p99', 'Peak RSS', title=f'End To End ({Base})')
+	try:
+		for Target in Args.Targets:
+			Server.Snapshot(Reset=True)
+			Result = await asyncio.to_thread(RunTarget, Target, Base, Args.Timeout)
+			Stats = Server.Snapshot()
+			Results.add_row(
+				Target, str(Result['Exit']), str(Result['Files']), f'{Result["Bytes"] / 1e6:.1f}', f'{Result["Seconds"]:.1f}',
+				f'{Result["Files"] / Result["Seconds"]:.1f}', f'{Result["Bytes"] / 1e6 / Result["Seconds"]:.2f}',
+				str(Stats['Requests']), str(Stats['Errors']), f'{Stats["P50"] * 1e3:.1f} ms', f'{Stats["P99"] * 1e3:.1f} ms',
+				f'{Result["PeakRss"] / 1e6:.0f} MB'
+			)
+	finally:
+		await Runner.cleanup()
+	Console.print(Results)
+
+async def BenchmarkShards(Args) -> None:
+	Server = MockServer(ConfigFrom(Args))
+	Runner, Base = await Serve(Server)
+	Results = Table('Shard', 'Exit', 'Files', 'MB', 'Seconds', 'Files/s', 'Peak RSS', title=f'{Args.Shards} Shards ({Base})')
+	try:
+		with tempfile.TemporaryDirectory(prefix='neofans-state-') as State:
+			Runs = await asyncio.gather(*(
+				asyncio.to_thread(RunTarget, 'fetcher', Base, Args.Timeout, ['--shard', f'{Index}/{Args.Shards}'], Path(State))
+				for Index in range(Args.Shards)
+			))
+			subprocess.run([sys.executable, str(Root / 'Fetcher.py'), '--merge', State], cwd=State, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+			Merged = Loads((Path(State) / 'Merged.json').read_bytes())
+		Stats = Server.Snapshot()
+	finally:
+		await Runner.cleanup()
+	for Index, Result in enumerate(Runs):
+		Results.add_row(
+			f'{Index}/{Args.Shards}', str(Result['Exit']), str(Result['Files']), f'{Result["Bytes"] / 1e6:.1f}', f'{Result["Seconds"]:.1f}',
+			f'{Result["Files"] / Result["Seconds"]:.1f}', f'{Result["PeakRss"] / 1e6:.0f} MB'
+		)
+	Console.print(Results)
+	Overlap = sum(len(Runs[Left]['Names'] & Runs[Right]['Names']) for Left in range(len(Runs)) for Right in range(Left + 1, len(Runs)))
+	Console.print(f'Merged {len(Merged["Hashes"])} Hashes And {len(Merged["Cursors"])} Cursors From {len(Merged["Shards"])} Shards, {Overlap} Files Downloaded By More Than One Shard, {Stats["Requests"]} Requests')
+
+async def Stream(Disk: Writer, Directory: Path, Payloads: list, Chunk: int, Verify: bool) -> float:
+	Start = time.perf_counter()
+	for Index, (Payload, Digest) in enumerate(Payloads):
+		async with Disk.Open(Directory / f'{Index}.bin', len(Payload), Digest if Verify else '') as File:
+			View = memoryview(Payload)
+			for Offset in range(0, len(View), Chunk):
+				await File.Write(View[Offset:Offset + Chunk])
+			await File.Commit()
+	return time.perf_counter() - Start
+
+async def BenchmarkVerify(Args) -> None:
+	Results = Table('Files', 'Size', 'Plain', 'Verified', 'Overhead', title=f'Inline SHA-256 Verification ({Args.Chunk // 1024} KB Chunks, Best Of {Args.Rounds})')
+	with tempfile.TemporaryDirectory(prefix='neofans-verify-') as Directory:
+		async with Writer(Path(Directory) / 'Temp', Path(Directory) / 'Files') as Disk:
+			Console.print(f'Placing Files Via {Disk.Placement.capitalize()}')
+			for Count, Size in ((256, 1 << 20), (32, 8 << 20), (4, 64 << 20)):
+				Payloads = [(Payload, hashlib.sha256(Payload).hexdigest()) for Payload in (random.randbytes(Size) for _ in range(Count))]
+				Plain = min([await Stream(Disk, Disk.Final, Payloads, Args.Chunk, False) for _ in range(Args.Rounds)])
+				Verified = min([await Stream(Disk, Disk.Final, Payloads, Args.Chunk, True) for _ in range(Args.Rounds)])
+				Results.add_row(
+					str(Count), f'{Size >> 20} MB', f'{Count * Size / Plain / 1e6:.0f} MB/s', f'{Count * Size / Verified / 1e6:.0f} MB/s',
+					f'{(Verified / Plain - 1) * 100:+.1f}%'
+				)
+	Console.print(Results)
+
+def ImportTime(Module: str) -> dict:
+	Result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {Module}'], cwd=Root, capture_output=True, text=True)
+	Times = {}
+	for Line in Result.stderr.splitlines():
+		Fields = Line.removeprefix('import time:').split('|')
+		if len(Fields) == 3 and Fields[0].strip().isdigit():
+			Times.setdefault(Fields[2][1:].rstrip(), (int(Fields[0]), int(Fields[1])))
+	return {'Exit': Result.returncode, 'Times': Times}
+
+def BenchmarkImportTime(Args) -> int:
+	Results = Table('Module', 'Exit', 'Cumulative', 'Self', 'Slowest Import', title=f'Import Time (-X importtime, Median Of {Args.Rounds})')
+	Over = []
+	for Module in Args.Modules:
+		Runs = [ImportTime(Module) for _ in range(Args.Rounds)]
+		Own = [Run['Times'].get(Module, (0, 0)) for Run in Runs]
+		Self, Cumulative = statistics.median(Time[0] for Time in Own) / 1e3, statistics.median(Time[1] for Time in Own) / 1e3
+		Name, (Slowest, _) = max(((Name, Time) for Name, Time in Runs[-1]['Times'].items() if Name != Module), key=lambda Item: Item[1][0], default=('-', (0, 0)))
+		Results.add_row(Module, str(max(Run['Exit'] for Run in Runs)), f'{Cumulative:.1f} ms', f'{Self:.1f} ms', f'{Name.strip()} ({Slowest / 1e3:.1f} ms)')
+		if Args.Budget and Self > Args.Budget:
+			Over.append(Module)
+	Console.print(Results)
+	if Over:
+		Console.print(f'Module Bodies Over The {Args.Budget:.0f} ms Budget: {", ".join(Over)}')
+	return 1 if Over else 0
+
+async def BenchmarkRclone(Args) -> None:
+	if not shutil.which('rclone'):
+		Console.print('rclone Is Not Installed, Skipping')
+		return
+	from rclone_python import rclone
+	Results = Table('Mode', 'Calls', 'Time', 'Per Call', title=f'rclone List / Mkdir Against A Local Remote ({Args.Directories} Directories)')
+	with tempfile.TemporaryDirectory(prefix='neofans-rclone-') as Directory:
+		for Index in range(Args.Directories):
+			(Path(Directory) / 'Existing' / str(Index)).mkdir(parents=True)
+			(Path(Directory) / 'Existing' / str(Index) / f'{Sha256(str(Index))}.jpg').write_bytes(b'')
+		Start = time.perf_counter()
+		for Index in range(Args.Directories):
+			await asyncio.to_thread(rclone.ls, f'{Directory}/Existing/{Index}')
+			await asyncio.to_thread(rclone.mkdir, f'{Directory}/Subprocess/{Index}')
+		Elapsed = time.perf_counter() - Start
+		Results.add_row('Subprocess', str(Args.Directories * 2), f'{Elapsed:.2f}s', f'{Elapsed / Args.Directories / 2 * 1e3:.1f} ms')
+		Start = time.perf_counter()
+		async with Daemon() as Rclone:
+			Calls = Rclone.Calls
+			await asyncio.gather(*(Call for Index in range(Args.Directories) for Call in (Rclone.List(f'{Directory}/Existing/{Index}'), Rclone.Mkdir(f'{Directory}/Rcd/{Index}'))))
+			Calls = Rclone.Calls - Calls
+		Elapsed = time.perf_counter() - Start
+		Results.add_row('rcd (Including Startup)', str(Calls), f'{Elapsed:.2f}s', f'{Elapsed / Calls * 1e3:.1f} ms')
+	Console.print(Results)
+
+def Rss(Pid: int) -> int:
+	try:
+		return next(int(Line.split()[1]) * 1024 for Line in Path(f'/proc/{Pid}/status').read_text().splitlines() if Line.startswith('VmRSS'))
+	except (OSError, StopIteration):
+		return 0
+
+def SoakTarget(Base: str, Duration: float, Interval: float) -> dict:
+	with tempfile.TemporaryDirectory(prefix='neofans-soak-') as Workdir:
+		shutil.copy(Root / 'config.json', Workdir)
+		Environ = {**os.environ, **Environment(Base), 'COLUMNS': '120', 'COOMER_SESS': 'benchmark', 'KEMONO_SESS': 'benchmark'}
+		Process = subprocess.Popen([sys.executable, str(Root / 'Fetcher.py'), '--profile', '--watchdog', '50', '--deadline', str(Duration), '--drain', '0'], cwd=Workdir, env=Environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		Start, Samples = time.perf_counter(), []
+		while Process.poll() is None:
+			Samples.append((time.perf_counter() - Start, Rss(Process.pid)))
+			time.sleep(Interval)
+		Report = Path(Workdir) / 'Data/Profile/Report.json'
+		return {'Exit': Process.returncode, 'Samples': [Sample for Sample in Samples if Sample[1]], 'Report': Loads(Report.read_bytes()) if Report.exists() else {}}
+
+async def BenchmarkSoak(Args) -> None:
+	Server = MockServer(ConfigFrom(Args))
+	Runner, Base = await Serve(Server)
+	try:
+		Result = await asyncio.to_thread(SoakTarget, Base, Args.Duration, Args.Interval)
+		Stats = Server.Snapshot()
+	finally:
+		await Runner.cleanup()
+	Samples, Report = Result['Samples'], Result['Report']
+	Tail = Samples[len(Samples) // 2:]
+	Slope = statistics.linear_regression([Second for Second, _ in Tail], [Size for _, Size in Tail]).slope * 60 / 1e6 if len(Tail) > 1 else 0.0
+	Results = Table('Metric', 'Value', title=f'Soak ({Args.Duration:.0f}s Against {Base})')
+	for Fraction in (.1, .5, .9):
+		Results.add_row(f'RSS At {Fraction:.0%}', f'{Samples[int(len(Samples) * Fraction)][1] / 1e6:.1f} MB' if Samples else '-')
+	Results.add_row('RSS At End', f'{Samples[-1][1] / 1e6:.1f} MB' if Samples else '-')
+	Results.add_row('RSS Slope (Second Half)', f'{Slope:+.2f} MB/min')
+	Results.add_row('GC Collections', str(sum(Report.get('Gc', {}).get('Collections', {}).values())))
+	Results.add_row('GC Pause Total / Max', f'{Report.get("Gc", {}).get("Total", 0) * 1e3:.1f} ms / {Report.get("Gc", {}).get("Max", 0) * 1e3:.1f} ms')
+	Results.add_row('Loop Lag P99 / Max', f'{Report.get("Lag", {}).get("P99", 0) * 1e3:.1f} ms / {Report.get("Lag", {}).get("Max", 0) * 1e3:.1f} ms')
+	Results.add_row('Loop Stalls Over 50 ms', str(Report.get('Stalls', {}).get('Count', 0)))
+	Results.add_row('Requests / Errors', f'{Stats["Requests"]} / {Stats["Errors"]}')
+	Results.add_row('Server Latency P50 / P99', f'{Stats["P50"] * 1e3:.1f} ms / {Stats["P99"] * 1e3:.1f} ms')
+	Results.add_row('Exit', str(Result['Exit']))
+	Console.print(Results)
+
+if __name__ == '__main__':
+	Parser = argparse.ArgumentParser(description='NeoFans Benchmarks')
+	Modes = Parser.add_subparsers(dest='Mode', required=True)
+	Modes.add_parser('json', help='Decode / encode API payloads').add_argument('--rounds', type=int, default=50, dest='Rounds')
+	Modes.add_parser('project', help='Projected field extraction vs full decode').add_argument('--rounds', type=int, default=50, dest='Rounds')
+	EndToEnd = AddArguments(Modes.add_parser('e2e', help='Run Fetcher.py and Main.py against the local mock server'))
+	EndToEnd.add_argument('--targets', nargs='+', choices=list(Targets), default=list(Targets), dest='Targets')
+	EndToEnd.add_argument('--timeout', type=float, default=600.0, dest='Timeout', help='Seconds before a target is terminated')
+	Sharded = AddArguments(Modes.add_parser('shards', help='Run Fetcher.py as N shards against the local mock server and merge their state'))
+	Sharded.add_argument('--shards', type=int, default=4, dest='Shards')
+	Sharded.add_argument('--timeout', type=float, default=600.0, dest='Timeout', help='Seconds before a shard is terminated')
+	Soak = AddArguments(Modes.add_parser('soak', help='Run Fetcher.py for a long time against the mock server and track RSS, GC pauses and loop lag'))
+	Soak.add_argument('--duration', type=float, default=600.0, dest='Duration', help='Seconds to run before the deadline stops Fetcher.py')
+	Soak.add_argument('--interval', type=float, default=1.0, dest='Interval', help='Seconds between RSS samples')
+	Verify = Modes.add_parser('verify', help='Write throughput through the file writer with and without inline SHA-256 verification')
+	Verify.add_argument('--rounds', type=int, default=3, dest='Rounds')
+	Verify.add_argument('--chunk', type=int, default=64 * 1024, dest='Chunk', help='Bytes per network chunk fed to the writer')
+	ImportTimes = Modes.add_parser('importtime', help='Import cost of each module, measured with python -X importtime in a fresh interpreter')
+	ImportTimes.add_argument('--modules', nargs='+', default=Modules, dest='Modules')
+	ImportTimes.add_argument('--rounds', type=int, default=5, dest='Rounds')
+	ImportTimes.add_argument('--budget', type=float, default=0.0, dest='Budget', help='Exit non-zero when a module body takes longer than N milliseconds')
+	Modes.add_parser('rclone', help='rclone listings and mkdirs through one rclone rcd vs a subprocess per call').add_argument('--directories', type=int, default=50, dest='Directories')
+	Args = Parser.parse_args()
+	random.seed(0)
+	if Args.Mode == 'json':
+		BenchmarkJson(Args.Rounds)
+	elif Args.Mode == 'project':
+		BenchmarkProjection(Args.Rounds)
+	elif Args.Mode == 'e2e':
+		asyncio.run(BenchmarkEndToEnd(Args))
+	elif Args.Mode == 'shards':
+		asyncio.run(BenchmarkShards(Args))
+	elif Args.Mode == 'soak':
+		asyncio.run(BenchmarkSoak(Args))
+	elif Args.Mode == 'verify':
+		asyncio.run(BenchmarkVerify(Args))
+	elif Args.Mode == 'importtime':
+		sys.exit(BenchmarkImportTime(Args))
+	elif Args.Mode == 'rclone':
+		asyncio.run(BenchmarkRclone(Args))
@@ -0,0 +1,154 @@
+from typing import Mapping, Optional, Tuple
+from Parser import Loads, Dumps
+from pathlib import Path
+import hashlib
+import asyncio
+import time
+import zlib
+import os
+
+Validators = (('ETag', 'If-None-Match'), ('Last-Modified', 'If-Modified-Since'))
+
+class ResponseCache:
+	def __init__(self, Directory: Path = Path('Data/Cache'), Enabled: bool = True, MaxAge: float = 2592000.0, MaxBytes: int = 1 << 30) -> None:
+		self.Directory = Directory
+		self.Enabled = Enabled
+		self.MaxAge = MaxAge
+		self.MaxBytes = MaxBytes
+
+	def Locate(self, Url: str) -> Path:
+		Digest = hashlib.sha1(Url.encode()).hexdigest()
+		return self.Directory / Digest[:2] / Digest
+
+	def Meta(self, Url: str) -> dict:
+		try:
+			with open(self.Locate(Url), 'rb') as File:
+				return Loads(File.readline())
+		except (OSError, ValueError):
+			return {}
+
+	def Read(self, Url: str) -> Optional[bytes]:
+		try:
+			with open(Target := self.Locate(Url), 'rb') as File:
+				File.readline()
+				Body = zlib.decompress(File.read())
+			os.utime(Target)
+			return Body
+		except (OSError, zlib.error):
+			return None
+
+	def Write(self, Url: str, Meta: dict, Body: bytes) -> None:
+		Target = self.Locate(Url)
+		Target.parent.mkdir(parents=True, exist_ok=True)
+		Temporary = Target.with_name(f'.{Target.name}.{os.getpid()}.tmp')
+		Temporary.write_bytes(Dumps(Meta) + b'\n' + zlib.compress(Body, 6))
+		os.replace(Temporary, Target)
+
+	def Prune(self) -> Tuple[int, int]:
+		if not self.Enabled:
+			return 0, 0
+		Entries, Cutoff = [], time.time() - self.MaxAge
+		for Shard in self.Directory.glob('[0-9a-f][0-9a-f]'):
+			with os.scandir(Shard) as Found:
+				for Entry in Found:
+					try:
+						Stat = Entry.stat(follow_symlinks=False)
+					except OSError:
+						continue
+					Entries.append((Stat.st_mtime, Stat.st_size, Entry.path))
+		Entries.sort(reverse=True)
+		Removed = Freed = Kept = 0
+		for Modified, Size, Entry in Entries:
+			if Modified >= Cutoff and Kept + Size <= self.MaxBytes:
+				Kept += Size
+				continue
+			try:
+				os.unlink(Entry)
+			except OSError:
+				continue
+			Removed += 1
+			Freed += Size
+		return Removed, Freed
+
+	async def Headers(self, Url: str) -> dict:
+		if not self.Enabled:
+			return {}
+		Meta = await asyncio.to_thread(self.Meta, Url)
+		return {Request: Meta[Response] for Response, Request in Validators if Meta.get(Response)}
+
+	async def Body(self, Url: str) -> Optional[bytes]:
+		return await asyncio.to_thread(self.Read, Url)
+
+	async def Store(self, Url: str, Headers: Mapping, Body: bytes) -> None:
+		Meta = {Response: Headers.get(Response) for Response, _ in Validators if Headers.get(Response)}
+		if self.Enabled and Meta:
+			await asyncio.to_thread(self.Write, Url, Meta, Body)
+
+class NegativeCache:
+	Ttls = {401: 86400.0, 403: 86400.0, 404: 1209600.0, 410: 2592000.0}
+	ClientTtl = 21600.0
+	ServerTtl = 900.0
+
+	def __init__(self, Target: Path = Path('Data/Cache/Negative.json'), Enabled: bool = True, Threshold: int = 3, Backoff: float = 3600.0, MaxBackoff: float = 604800.0) -> None:
+		self.Target = Target
+		self.Enabled = Enabled
+		self.Threshold = Threshold
+		self.Backoff = Backoff
+		self.MaxBackoff = MaxBackoff
+		self.Files: dict[str, list] = {}
+		self.Creators: dict[str, list] = {}
+
+	def Ttl(self, Status: int) -> float:
+		if Status in self.Ttls:
+			return self.Ttls[Status]
+		if Status >= 500:
+			return self.ServerTtl
+		return self.ClientTtl if Status >= 400 and Status != 429 else 0.0
+
+	def Read(self) -> dict:
+		try:
+			return Loads(self.Target.read_bytes())
+		except (OSError, ValueError):
+			return {}
+
+	def Load(self) -> None:
+		if not self.Enabled:
+			return
+		Now, Data = time.time(), self.Read()
+		self.Files = {Url: Entry for Url, Entry in Data.get('Files', {}).items() if Entry[0] > Now}
+		self.Creators = dict(Data.get('Creators', {}))
+
+	def Save(self) -> None:
+		if not self.Enabled:
+			return
+		Now, Data = time.time(), self.Read()
+		Files = {Url: Entry for Url, Entry in Data.get('Files', {}).items() if Entry[0] > Now}
+		for Url, Entry in self.Files.items():
+			if Entry[0] > Files.get(Url, (0,))[0]:
+				Files[Url] = Entry
+		Creators = {**Data.get('Creators', {}), **self.Creators}
+		self.Target.parent.mkdir(parents=True, exist_ok=True)
+		Temporary = self.Target.with_name(f'.{self.Target.name}.{os.getpid()}.tmp')
+		Temporary.write_bytes(Dumps({'Files': Files, 'Creators': {Key: Entry for Key, Entry in Creators.items() if Entry[0]}}))
+		os.replace(Temporary, self.Target)
+
+	def Failing(self, Url: str) -> bool:
+		Entry = self.Files.get(Url)
+		return bool(Entry) and Entry[0] > time.time()
+
+	def Record(self, Url: str, Status: int) -> None:
+		Ttl = self.Ttl(Status)
+		if self.Enabled and Ttl:
+			self.Files[Url] = [time.time() + Ttl, Status]
+
+	def Waiting(self, Creator: str) -> float:
+		return max(0.0, self.Creators.get(Creator, (0, 0.0))[1] - time.time())
+
+	def Failed(self, Creator: str) -> None:
+		Failures = self.Creators.get(Creator, (0, 0.0))[0] + 1
+		Delay = min(self.Backoff * 2 ** (Failures - self.Threshold), self.MaxBackoff) if Failures >= self.Threshold else 0.0
+		self.Creators[Creator] = [Failures, time.time() + Delay]
+
+	def Succeeded(self, Creator: str) -> None:
+		if Creator in self.Creators:
+			self.Creators[Creator] = [0, 0.0]
@@ -0,0 +1,156 @@
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+from collections import Counter
+from Parser import Project, Empty, Loads, DecodeError
+import posixpath
+import asyncio
+import math
+
+@dataclass
+class Item:
+	Url: str
+	Hash: str
+	Extension: str
+	Position: int
+
+@dataclass
+class Page:
+	Cursor: int
+	Total: int
+	Items: list = field(default_factory=list)
+	Skipped: Counter = field(default_factory=Counter)
+
+class Adapter(ABC):
+	Size = 0
+	Start = 0
+	Step = 1
+
+	def __init__(self, Host: str, Id: str, Cursor: Optional[int] = None) -> None:
+		self.Host = Host
+		self.Id = Id
+		self.Cursor = self.Start if Cursor is None else Cursor
+		self.Status: Optional[int] = None
+
+	@property
+	def Last(self) -> int:
+		return self.Cursor + 1 - self.Start
+
+	@abstractmethod
+	def Url(self, Cursor: int) -> str:
+		...
+
+	def Valid(self, Body: bytes) -> bool:
+		return True
+
+	@abstractmethod
+	def Parse(self, Body: bytes) -> list:
+		...
+
+	def Next(self, Cursor: int) -> int:
+		return Cursor + self.Step
+
+	@staticmethod
+	def Split(Url: str) -> Tuple[str, str]:
+		return posixpath.splitext(Url.rsplit('/', 1)[-1])
+
+class Kemono(Adapter):
+	Size = 50
+	Step = 50
+
+	def __init__(self, Host: str, Service: str, Id: str, Cursor: Optional[int] = None, Suffix: str = '/posts') -> None:
+		super().__init__(Host, Id, Cursor)
+		self.Service = Service
+		self.Suffix = Suffix
+
+	@property
+	def Last(self) -> int:
+		return self.Cursor
+
+	def Url(self, Cursor: int) -> str:
+		return f'{self.Host}/api/v1/{self.Service}/user/{self.Id}{self.Suffix}?o={Cursor}'
+
+	def Valid(self, Body: bytes) -> bool:
+		return Body.lstrip().startswith(b'[') and not Empty(Body)
+
+	def Parse(self, Body: bytes) -> list:
+		return list(dict.fromkeys(f'{self.Host}{Item["path"]}' for Post in Loads(Body) for Item in [Post.get('file') or {}, *(Post.get('attachments') or [])] if Item.get('path')))
+
+class Rule34(Adapter):
+	Size = 1000
+
+	def Url(self, Cursor: int) -> str:
+		return f'{self.Host}/index.php?' + urlencode({'page': 'dapi', 's': 'post', 'q': 'index', 'json': 1, 'tags': self.Id, 'pid': Cursor, 'limit': self.Size}, safe='+')
+
+	def Parse(self, Body: bytes) -> list:
+		return Project(Body, 'file_url')
+
+class E621(Adapter):
+	Size = 320
+	Start = 1
+
+	def __init__(self, Host: str, Id: str, Cursor: Optional[int] = None, Login: Optional[str] = None, Key: Optional[str] = None) -> None:
+		super().__init__(Host, Id, Cursor)
+		self.Credentials = {'login': Login, 'api_key': Key} if Login and Key else {}
+
+	def Url(self, Cursor: int) -> str:
+		return f'{self.Host}/posts.json?' + urlencode({'limit': self.Size, 'tags': self.Id, 'page': Cursor, **self.Credentials}, safe='+')
+
+	def Valid(self, Body: bytes) -> bool:
+		return b'"posts"' in Body
+
+	def Parse(self, Body: bytes) -> list:
+		return list(dict.fromkeys(Post['file']['url'] for Post in Loads(Body)['posts'] if (Post.get('file') or {}).get('url')))
+
+class Engine:
+	def __init__(self, Fetch: Callable[[str], Awaitable[Tuple[Optional[int], Optional[bytes]]]], Prefetch: bool = True) -> None:
+		self.Fetch = Fetch
+		self.Prefetch = Prefetch
+
+	def Request(self, Source: Adapter, Cursor: int) -> asyncio.Future:
+		return asyncio.ensure_future(self.Fetch(Source.Url(Cursor)))
+
+	async def Pages(self, Source: Adapter, Skip: Callable[[Item], str] = lambda _: '', Limit: float = math.inf, MinNew: int = 0) -> AsyncIterator[Page]:
+		Pending = self.Request(Source, Source.Cursor) if Limit > 0 else None
+		try:
+			while Pending:
+				Source.Status, Body = await Pending
+				Pending = None
+				if Source.Status != 200 or not Body or not Source.Valid(Body):
+					return
+				try:
+					Urls = Source.Parse(Body)
+				except (DecodeError, LookupError, AttributeError):
+					return
+				if not Urls:
+					return
+				Current = Page(Source.Cursor, len(Urls))
+				for Position, Url in enumerate(Urls):
+					if len(Current.Items) >= Limit:
+						break
+					Hash, Extension = Source.Split(Url)
+					Found = Item(Url, Hash, Extension, Position)
+					if Reason := Skip(Found):
+						Current.Skipped[Reason] += 1
+					elif Hash:
+						Current.Items.append(Found)
+				Limit -= len(Current.Items)
+				More = Limit > 0 and len(Current.Items) >= MinNew
+				if More and self.Prefetch:
+					Pending = self.Request(Source, Source.Next(Source.Cursor))
+				yield Current
+				if More:
+					Source.Cursor = Source.Next(Source.Cursor)
+					Pending = Pending or self.Request(Source, Source.Cursor)
+		finally:
+			if Pending:
+				Pending.cancel()
+				await asyncio.gather(Pending, return_exceptions=True)
+
+	async def Files(self, Source: Adapter, Skip: Callable[[Item], str] = lambda _: '', Limit: float = math.inf, MinNew: int = 0) -> AsyncIterator[Item]:
+		async with aclosing(self.Pages(Source, Skip, Limit, MinNew)) as Pages:
+			async for Current in Pages:
+				for Found in Current.Items:
+					yield Found
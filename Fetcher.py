@@ -5,24 +5,46 @@ from tenacity import retry, stop_after_attempt, wait_exponential, RetryError, re
 from rclone_python.utils import RcloneException
 from rclone_python import rclone
 from dotenv import load_dotenv
-import aiofiles.os
 import aiofiles
 import aiohttp
-import orjson
+
+# Local Imports
+from Parser import Loads, Dumps
+from Profiler import Profiler
+from Network import Network, Lane, CircuitOpen, States
+from Engine import Engine, Kemono, Item
+from Packer import Pack, Indexed, Members
+from Rclone import Daemon
+from Writer import Writer, Mismatch
+from Proxies import ProxyPool
+from Cache import ResponseCache, NegativeCache
+import Metrics
 
 # Default Imports
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, aclosing, nullcontext
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import Union, Tuple
+from typing import Iterator, Optional, Union, Tuple
+from urllib.parse import urlsplit
 from asyncio import Queue
 from pathlib import Path
+import multiprocessing
+import itertools
+import heapq
 import platform
+import argparse
+import signal
 import asyncio
 import shutil
 import random
+import traceback
 import math
+import time
 import sys
 import os
-import gc
+import functools
+import zlib
 import re
 
 # Special Imports For Linux Systems
@@ -34,9 +56,13 @@ if platform.system() == 'Linux':
 from rich.console import Console as RichConsole
 from rich.traceback import install as Install
 from rich.highlighter import RegexHighlighter
+from logging.handlers import QueueHandler, QueueListener
 from rich.logging import RichHandler
 from rich.theme import Theme
+from rich.text import Text
 import logging
+import atexit
+import queue
 
 # Config
 QueueThresholds = [.2, .8]
@@ -44,13 +70,41 @@ SemaphoreLimit = 8
 QueueLimit = 2500
 PageOffset = 50
 StartingPage = 0
-ChunkSize = 3e+6
+ChunkSize = 4 << 20
 TempDir = Path('Data/Temp')
 FinalDir = Path('Data/Files')
 PublishedDateFile = Path('Data/LPD.json')
-LowDiskSpaceThreshold = max(5e+9, shutil.disk_usage('.').free * 0.1)
+StateDir = Path('Data/State')
+CacheDir = Path('Data/Cache')
 rclone.set_log_level('ERROR')
 TimeoutConfig = 300.0
+MaxDeferrals = 5
+
+# Metrics
+QueueDepth = Metrics.Default.Gauge('neofans_queue_depth', 'Files waiting in the download queue')
+ActiveDownloads = Metrics.Default.Gauge('neofans_active_downloads', 'Downloads currently transferring')
+DownloadedBytes = Metrics.Default.Counter('neofans_downloaded_bytes_total', 'Bytes written to disk per host')
+DownloadRate = Metrics.Rate(Metrics.Default, DownloadedBytes, 'neofans_download_bytes_per_second', 'Download throughput per host since the last scrape')
+RequestSeconds = Metrics.Default.Histogram('neofans_request_seconds', 'Request latency per host and lane')
+FileResults = Metrics.Default.Counter('neofans_files_total', 'Files processed by outcome')
+SkippedFiles = Metrics.Default.Counter('neofans_skipped_total', 'Files skipped before download by reason')
+SkippedCreators = Metrics.Default.Counter('neofans_skipped_creators_total', 'Creators skipped while backing off after repeated failures')
+FailedRequests = Metrics.Default.Counter('neofans_failures_total', 'Failed requests per host and lane')
+ProxyCount = Metrics.Default.Gauge('neofans_proxies', 'Proxies in the pool by state')
+CachedResponses = Metrics.Default.Counter('neofans_api_cache_total', 'API responses served from a 304 revalidation or fetched in full')
+CorruptFiles = Metrics.Default.Counter('neofans_corrupt_total', 'Downloads rejected for not matching their content hash per host')
+CircuitState = Metrics.Default.Gauge('neofans_circuit_state', 'Circuit breaker state per host (0 closed, 1 half-open, 2 open)')
+CircuitTrips = Metrics.Default.Gauge('neofans_circuit_trips', 'Times the circuit breaker opened per host')
+ConnectionPools = Metrics.Default.Gauge('neofans_connection_pools', 'Open connection pools per lane')
+PoolRotations = Metrics.Default.Gauge('neofans_connection_pool_rotations', 'Connection pools rotated for age or failed health checks per lane')
+DroppedLogs = Metrics.Default.Counter('neofans_dropped_logs_total', 'Log records below WARNING dropped because the console fell behind per level')
+DiskFree = Metrics.Default.Gauge('neofans_disk_free_bytes', 'Free disk space')
+DiskHeadroom = Metrics.Default.Gauge('neofans_disk_headroom_bytes', 'Free disk space above the low disk space threshold')
+
+@Metrics.Default.Collector
+def CollectDisk() -> None:
+	DiskFree.Set(shutil.disk_usage('.').free)
+	DiskHeadroom.Set(DiskFree.Get() - LowDiskSpaceThreshold())
 
 AiohttpExceptions = [
 	aiohttp.ClientError,
@@ -67,7 +121,12 @@ AiohttpExceptions = [
 	asyncio.TimeoutError
 ]
 
+@functools.cache
+def LowDiskSpaceThreshold() -> float:
+	return max(5e+9, shutil.disk_usage('.').free * 0.1)
+
 # Logging Configuration
+@functools.cache
 def GradientColor(Start, End, Steps):
 	return [
 		f'#{int(Start[1:3], 16) + int((int(End[1:3], 16) - int(Start[1:3], 16)) / Steps * Step):02X}'
@@ -76,9 +135,6 @@ def GradientColor(Start, End, Steps):
 		for Step in range(Steps)
 	]
 
-def GenerateHighlightPatterns(MaxValue: int, Format: str) -> list:
-	return [re.compile(Format.format(Value=Value, Max=MaxValue)) for Value in range(MaxValue + 1)]
-
 class DownloadHighlighter(RegexHighlighter):
 	base_style = 'downloader.'
 	highlights = [
@@ -95,13 +151,16 @@ class DownloadHighlighter(RegexHighlighter):
 		r'\[(?P<debug>debug|Debug)\]',
 	]
 
-	highlights.extend([rf'\[(?P<queue_{Queue}>{Queue}/{QueueLimit})\]' for Queue in range(QueueLimit + 1)])
+	Gradients = [
+		(re.compile(rf'\[(?P<Span>(?P<Value>\d+)/{QueueLimit})\]'), ('#F5A3A3', '#A0D6B4'), QueueLimit),
+		(re.compile(r'(?P<Span>(?P<Value>\d+)\.\d{2}%)'), ('#A0D6B4', '#B3D7EC'), 100)
+	]
 
-	for Percent in range(101):
-		if Percent < 100:
-			highlights.append(rf'(?P<percent_{Percent}>{Percent}\.\d{{2}}%)')
-		else:
-			highlights.append(r'(?P<percent_100>100\.00%)')
+	def highlight(self, text: Text) -> None:
+		super().highlight(text)
+		for Pattern, (Start, End), Limit in self.Gradients:
+			for Match in Pattern.finditer(text.plain):
+				text.stylize(GradientColor(Start, End, Limit + 1)[min(int(Match['Value']), Limit)], *Match.span('Span'))
 
 ThemeDict = {
 	'log.time': 'bright_black',
@@ -121,21 +180,33 @@ ThemeDict = {
 	'downloader.info': '#A0D6B4',
 }
 
-def SetupThemeColors():
-	QueueColors = GradientColor('#F5A3A3', '#A0D6B4', QueueLimit + 1)
-	PercentColors = GradientColor('#A0D6B4', '#B3D7EC', 101)
+class DroppingQueueHandler(QueueHandler):
+	def __init__(self, queue: queue.Queue, Fallback: logging.Handler) -> None:
+		super().__init__(queue)
+		self.Fallback = Fallback
 
-	for Count, Color in enumerate(QueueColors):
-		ThemeDict[f'downloader.queue_{Count}'] = Color
+	def enqueue(self, record: logging.LogRecord) -> None:
+		try:
+			self.queue.put_nowait(record)
+		except queue.Full:
+			if record.levelno >= logging.WARNING:
+				self.Fallback.handle(record)
+			else:
+				DroppedLogs.Inc(Level=record.levelname)
 
-	for Count, Color in enumerate(PercentColors):
-		ThemeDict[f'downloader.percent_{Count}'] = Color
+class BlockingQueueListener(QueueListener):
+	def enqueue_sentinel(self) -> None:
+		self.queue.put(self._sentinel)
 
-	return Theme(ThemeDict)
+Console: RichConsole = None
+Log = logging.getLogger('rich')
 
 def InitLogging():
-	CustomTheme = SetupThemeColors()
-	Console = RichConsole(theme=CustomTheme, force_terminal=True, log_path=False,
+	global Console
+	if Console is not None:
+		return Console, Log
+
+	Console = RichConsole(theme=Theme(ThemeDict), force_terminal=True, log_path=False,
 						 highlighter=DownloadHighlighter(), color_system='truecolor')
 
 	ConsoleHandler = RichHandler(markup=True, rich_tracebacks=True, show_time=True,
@@ -146,13 +217,19 @@ def InitLogging():
 
 	logging.basicConfig(level=logging.DEBUG, handlers=[ConsoleHandler], force=True)
 
-	Log = logging.getLogger('rich')
+	Listener = BlockingQueueListener(queue.Queue(maxsize=4096), ConsoleHandler)
+	Listener.start()
+	atexit.register(Listener.stop)
+
 	Log.handlers.clear()
-	Log.addHandler(ConsoleHandler)
+	Log.addHandler(DroppingQueueHandler(Listener.queue, ConsoleHandler))
 	Log.propagate = False
 
 	logging.getLogger('httpx').setLevel(logging.WARNING)
 
+	Install()
+	load_dotenv()
+
 	return Console, Log
 
 def ErrorLogger(Error):
@@ -161,12 +238,9 @@ def ErrorLogger(Error):
 	elif any(isinstance(Error, ExceptionType) for ExceptionType in [asyncio.CancelledError, KeyboardInterrupt, PermissionError]):
 		pass
 	else:
+		InitLogging()
 		Console.print_exception(max_frames=1, width=Console.width or 120)
 
-Console, Log = InitLogging()
-Install()
-load_dotenv()
-
 RetryConfig = dict(
 	stop=stop_after_attempt(5),
 	wait=wait_exponential(multiplier=1, min=4, max=10) + wait_random(0, 2),
@@ -188,6 +262,10 @@ class FileData:
 	Path: Path
 	Hash: Union[str, int, Tuple[str, int]]
 	Extension: str
+	Size: int = 0
+	Age: Tuple[int, int] = (0, 0)
+	Platform: str = ''
+	Deferrals: int = 0
 
 @dataclass
 class CreatorData:
@@ -199,23 +277,66 @@ class CreatorData:
 class LowDiskSpace(Exception):
 	pass
 
-Log.info('Rclone Is Installed' if rclone.is_installed() else 'Rclone Is Not Installed.')
+class DownloadScheduler(Queue):
+	Policies = ['fifo', 'newest', 'smallest', 'fair', 'mixed']
+
+	def __init__(self, maxsize: int = 0, Policy: str = 'fifo') -> None:
+		self.Policy = Policy
+		self.Sizing = Policy in ('smallest', 'mixed')
+		self.Counter = itertools.count()
+		self.Sequences = defaultdict(int)
+		super().__init__(maxsize)
+
+	def Key(self, File: FileData) -> Union[float, Tuple[int, int]]:
+		self.Sequences[File.ID] += 1
+		if self.Policy == 'newest':
+			return File.Age
+		if self.Policy == 'smallest':
+			return File.Size or math.inf
+		if self.Policy == 'fair':
+			return self.Sequences[File.ID]
+		if self.Policy == 'mixed':
+			return File.Age[0] / PageOffset + math.log2(max(File.Size or ChunkSize, 1) / 1048576) + self.Sequences[File.ID] / SemaphoreLimit
+		return 0
+
+	def _init(self, maxsize: int) -> None:
+		self._queue = []
+
+	def _put(self, File: FileData) -> None:
+		heapq.heappush(self._queue, (self.Key(File), next(self.Counter), File))
+
+	def _get(self) -> FileData:
+		return heapq.heappop(self._queue)[-1]
+
+CreatedDirectories = set()
+
+async def EnsureDirectories(*Directories: Path) -> None:
+	Missing = [Directory for Directory in dict.fromkeys(Directories) if Directory not in CreatedDirectories]
+	if Missing:
+		await asyncio.to_thread(lambda: [os.makedirs(Directory, exist_ok=True) for Directory in Missing])
+		CreatedDirectories.update(Missing)
 
 # Fetcher Class
 class Fetcher:
-	def __init__(self, Session: aiohttp.ClientSession, Log: logging.Logger, ErrorLogger: logging.Logger, DownloadQueue: Queue) -> None:
+	def __init__(self, Lanes: Network, Log: logging.Logger, ErrorLogger: logging.Logger, Policy: str = 'fifo', Caching: bool = True, Rclone: Optional[Daemon] = None) -> None:
 		self.Log = Log
 		self.ErrorLogger = ErrorLogger
-		self.Session = Session
+		self.Lanes = Lanes
+		self.Rclone = Rclone
+		self.Cache = ResponseCache(CacheDir, Caching)
+		self.Negative = NegativeCache(CacheDir / 'Negative.json', Caching)
+		self.Negative.Load()
 		self.TotalFiles = 0
-		self.DownloadQueue = DownloadQueue
 		self.Stopped = False
 		self.Hashes = set()
+		self.RemoteName = None
+		self.Cursors = {}
+		self.ProbeSemaphore = asyncio.Semaphore(SemaphoreLimit * 2)
 		self.Data = {
 			'coomer':
 				{
-					'BaseUrl': 'https://coomer.su/api/v1',
-					'FileUrl': 'https://coomer.su',
+					'BaseUrl': f'{os.getenv("COOMER_URL", "https://coomer.su")}/api/v1',
+					'FileUrl': os.getenv('COOMER_URL', 'https://coomer.su'),
 					'Session': os.getenv('COOMER_SESS'),
 					'Services': ['onlyfans', 'fansly'],
 					'Creators': {
@@ -225,17 +346,12 @@ class Fetcher:
 					'Directory': {
 						'onlyfans': '🌀 OnlyFans',
 						'fansly': '🔒 Fansly'
-					},
-					'Posts':
-						{
-							'onlyfans': [],
-							'fansly': []
-						}
+					}
 				},
 			'kemono':
 				{
-					'BaseUrl': 'https://kemono.su/api/v1',
-					'FileUrl': 'https://kemono.su',
+					'BaseUrl': f'{os.getenv("KEMONO_URL", "https://kemono.su")}/api/v1',
+					'FileUrl': os.getenv('KEMONO_URL', 'https://kemono.su'),
 					'Session': os.getenv('KEMONO_SESS'),
 					'Services': ['patreon', 'subscribestar', 'gumroad', 'fanbox'],
 					'Creators': {
@@ -249,26 +365,46 @@ class Fetcher:
 						'subscribestar': '⭐ SubscribeStar',
 						'gumroad': '🍬 Gumroad',
 						'fanbox': '📦 Fanbox'
-					},
-					'Posts': {
-						'patreon': [],
-						'subscribestar': [],
-						'gumroad': [],
-						'fanbox': []
 					}
 				}
 			}
+		self.DownloadQueues = {Platform: DownloadScheduler(QueueLimit, Policy) for Platform in self.Data}
+
+	def Queued(self) -> int:
+		return sum(Queue.qsize() for Queue in self.DownloadQueues.values())
+
+	def Known(self, Hash: str) -> bool:
+		return Hash[:30] in self.Hashes or Hash in self.Hashes
+
+	def CreatorPath(self, Creator: CreatorData) -> Path:
+		return Path(f'Data/{self.Data[Creator.Platform]["Directory"][Creator.Service]}/{Creator.Name}')
+
+	async def Remote(self) -> str:
+		if not self.RemoteName:
+			self.RemoteName = (await self.Rclone.Remotes() if self.Rclone else await asyncio.to_thread(rclone.get_remotes))[-1]
+		return self.RemoteName
+
+	async def List(self, Path: str) -> list[dict]:
+		return await self.Rclone.List(Path) if self.Rclone else await asyncio.to_thread(rclone.ls, Path)
+
+	async def Cat(self, Fs: str, Name: str) -> Union[bytes, str]:
+		return await self.Rclone.Cat(Fs, Name) if self.Rclone else await asyncio.to_thread(rclone.cat, f'{Fs}/{Name}')
+
+	async def Mkdir(self, Path: str) -> None:
+		await self.Rclone.Mkdir(Path) if self.Rclone else await asyncio.to_thread(rclone.mkdir, Path)
 
 	async def CreateDirectories(self) -> None:
-		Directories = rclone.ls(f'{rclone.get_remotes()[-1]}')
+		Remote = await self.Remote()
+		Directories = await self.List(Remote)
 		for Platform in self.Data:
 			for Directory in self.Data[Platform]['Directory'].values():
 				if Directory not in [Dir['Name'] for Dir in Directories]:
-					rclone.mkdir(f'{rclone.get_remotes()[-1]}{Directory}')
+					await self.Mkdir(f'{Remote}{Directory}')
 					self.Log.info(f'Created Missing Directory {Directory} On Remote Storage')
 
 	async def LookupHashes(self) -> None:
 		ProcessedHashes = set()
+		Remote = await self.Remote()
 		NewSemaphoreLimit = max((SemaphoreLimit // 2), 1)
 		Semaphore = asyncio.Semaphore(NewSemaphoreLimit)
 
@@ -277,11 +413,11 @@ class Fetcher:
 				async with Semaphore:
 					self.Log.debug(f'Looking Up Hashes For {CreatorName} From {Directory}...')
 					try:
-						Files = await asyncio.to_thread(
-							rclone.ls,
-							f'{rclone.get_remotes()[-1]}{Directory}/{CreatorName}'
-						)
+						Files = await self.List(f'{Remote}{Directory}/{CreatorName}')
 						for File in [File['Name'] for File in Files]:
+							if Indexed(File):
+								ProcessedHashes.update(Hash[:30] for Hash in Members(await self.Cat(f'{Remote}{Directory}/{CreatorName}', File)))
+								continue
 							Hash = Path(File).stem
 							if len(Hash) >= 30:
 								ProcessedHashes.add(Hash[:30])
@@ -296,10 +432,7 @@ class Fetcher:
 		for Platform in self.Data:
 			for Directory in self.Data[Platform]['Directory'].values():
 				try:
-					Creators = await asyncio.to_thread(
-						rclone.ls,
-						f'{rclone.get_remotes()[-1]}{Directory}'
-					)
+					Creators = await self.List(f'{Remote}{Directory}')
 					for Creator in Creators:
 						CreatorTasks.append((Directory, Creator['Name']))
 				except RcloneException:
@@ -318,35 +451,60 @@ class Fetcher:
 			if Tasks:
 				await asyncio.gather(*Tasks)
 
-			self.Hashes = ProcessedHashes
+			self.Hashes.update(ProcessedHashes)
 			self.Log.info(f'Loaded {len(self.Hashes)} Valid Hashes From Remote Storage')
 
+	async def Hold(self, Lane: Lane, Host: str) -> None:
+		while not self.Stopped and Lane.Circuit(Host).Blocked():
+			await asyncio.sleep(1)
+
+	async def Cached(self, Url: str, **Options) -> Tuple[int, bytes]:
+		Headers = await self.Cache.Headers(Url)
+		while True:
+			async with self.Lanes.Api.Get(Url, headers=Headers, **Options) as Response:
+				if Response.status == 304 and Headers:
+					Body = await self.Cache.Body(Url)
+					if Body is not None:
+						CachedResponses.Inc(Host=Response.url.host, Result='revalidated')
+						return 200, Body
+					Headers = {}
+					continue
+				Body = await Response.read() if Response.ok else b''
+				if Response.status == 200:
+					CachedResponses.Inc(Host=Response.url.host, Result='fetched')
+					await self.Cache.Store(Url, Response.headers, Body)
+				return Response.status, Body
+
 	async def Favorites(self) -> None:
 		Counter = 0
 		Tasks = []
 		#(**RetryConfig)
 		async def Fetch(Platform: str, BaseUrl: str) -> None:
 			nonlocal Counter
+			Host = urlsplit(BaseUrl).hostname
 			try:
-				async with self.Session.get(
-					f'{BaseUrl}/account/favorites?type=artist',
-					cookies={'session': self.Data[Platform]['Session']}
-				) as Response:
-					Response.raise_for_status()
-					Creators = orjson.loads(await Response.text())
-					for Creator in Creators:
-						self.Data[Platform]['Creators'][Creator['service']].append(
-							CreatorData(
-								ID=Creator['id'],
-								Name=Creator['name'].title(),
-								Platform=Platform,
-								Service=Creator['service']
-							)
+				with Metrics.Timer(RequestSeconds, Host=Host, Lane='api'):
+					Status, Body = await self.Cached(
+						f'{BaseUrl}/account/favorites?type=artist',
+						cookies={'session': self.Data[Platform]['Session']}
+					)
+				if Status != 200:
+					FailedRequests.Inc(Host=Host, Lane='api')
+					self.Log.warning(f'Failed To Fetch Favorites From {Platform.capitalize()} ({Status})')
+					return
+				for Creator in Loads(Body):
+					self.Data[Platform]['Creators'][Creator['service']].append(
+						CreatorData(
+							ID=Creator['id'],
+							Name=Creator['name'].title(),
+							Platform=Platform,
+							Service=Creator['service']
 						)
-						Counter += 1
+					)
+					Counter += 1
 			except Exception as Error:
 				self.ErrorLogger(Error)
-				self.Log.warning(f'Failed To Fetch Favorites From {Platform.capitalize()} ({Response.status})')
+				self.Log.warning(f'Failed To Fetch Favorites From {Platform.capitalize()}')
 
 		for Platform in self.Data:
 			Tasks.append(Fetch(Platform, self.Data[Platform]['BaseUrl']))
@@ -354,125 +512,125 @@ class Fetcher:
 		await asyncio.gather(*Tasks)
 		self.Log.debug(f'Fetched {Counter} Favorites')
 
+	async def Probe(self, File: FileData) -> None:
+		async with self.ProbeSemaphore:
+			try:
+				with Metrics.Timer(RequestSeconds, Host=urlsplit(File.Url).hostname, Lane='probe'):
+					async with self.Lanes.Media.Head(File.Url, allow_redirects=True) as Response:
+						File.Size = Response.content_length or 0 if Response.ok else 0
+			except Exception:
+				FailedRequests.Inc(Host=urlsplit(File.Url).hostname, Lane='probe')
+
+	async def Page(self, Creator: CreatorData, Url: str) -> Tuple[int, bytes]:
+		DownloadQueue = self.DownloadQueues[Creator.Platform]
+		QueueThreshold = DownloadQueue.maxsize * QueueThresholds[1]
+		if DownloadQueue.qsize() >= QueueThreshold:
+			self.Log.warning(f'Pausing Fetcher For {Creator.Name} - Queue At {DownloadQueue.qsize()}')
+			while DownloadQueue.qsize() > (QueueThreshold * QueueThresholds[0]):
+				await asyncio.sleep(1)
+			self.Log.warning(f'Resuming Fetcher For {Creator.Name} - Queue At {DownloadQueue.qsize()}')
+
+		Host = urlsplit(Url).hostname
+		while not self.Stopped:
+			try:
+				Start = time.perf_counter()
+				Status, Body = await self.Cached(Url, cookies={'session': self.Data[Creator.Platform]['Session']})
+			except CircuitOpen as Error:
+				self.Log.warning(f'{Error}, Holding {Creator.Name}')
+				await self.Hold(self.Lanes.Api, Error.Host)
+				continue
+			if Status == 200:
+				self.Negative.Succeeded(Key(Creator))
+				RequestSeconds.Observe(time.perf_counter() - Start, Host=Host, Lane='api')
+			else:
+				FailedRequests.Inc(Host=Host, Lane='api')
+				self.Negative.Failed(Key(Creator))
+			return Status, Body
+		return 0, b''
+
+	def Skip(self, Item: Item) -> str:
+		if self.Negative.Failing(Item.Url):
+			return 'failing'
+		return 'known' if self.Known(Item.Hash) else ''
+
 	async def Posts(self, Creator: CreatorData) -> None:
-		CurrentCounter = 0
-		CurrentSkipped = 0
 		Counter = 0
 		SkippedCounter = 0
-		Page = StartingPage
-		QueueThreshold = self.DownloadQueue.maxsize * QueueThresholds[1]
+		DownloadQueue = self.DownloadQueues[Creator.Platform]
 		MinNewPostsThreshold = 10
 
 		if self.Stopped:
 			return
 
-		#@retry(**RetryConfig)
-		async def Fetch(Creator: CreatorData) -> bool:
-			nonlocal CurrentCounter, Counter, SkippedCounter, Page, CurrentSkipped
-			while not self.Stopped:
-				CurrentCounter = 0
-				CurrentSkipped = 0
-				NewPostsCount = 0
-
-				if self.DownloadQueue.qsize() >= QueueThreshold:
-					self.Log.warning(f'Pausing Fetcher For {Creator.Name} - Queue At {self.DownloadQueue.qsize()}')
-					while self.DownloadQueue.qsize() > (QueueThreshold * QueueThresholds[0]):
-						await asyncio.sleep(1)
-					self.Log.warning(f'Resuming Fetcher For {Creator.Name} - Queue At {self.DownloadQueue.qsize()}')
-				try:
-					async with self.Session.get(
-						f'{self.Data[Creator.Platform]["BaseUrl"]}/{Creator.Service}/user/{Creator.ID}/posts',
-						cookies={'session': self.Data[Creator.Platform]['Session']},
-						params={'o': Page * PageOffset}
-					) as Response:
-						if Response.status == 200:
-							Posts = orjson.loads(await Response.text())
-							if not Posts:
-								return False
-
-							for Post in Posts:
-								if Post.get('file') and Post['file'].get('path'):
-									FilePath = Path(Post['file']['path'])
-									CurrentCounter += 1
-
-									if not any(str(FilePath.stem).startswith(Hash) for Hash in self.Hashes):
-										NewPostsCount += 1
-										FileInfo = FileData(
-											ID=Creator.ID,
-											Name=Creator.Name,
-											Url=f'{self.Data[Creator.Platform]["FileUrl"]}{Post["file"]["path"]}',
-											Path=Path(f'Data/{self.Data[Creator.Platform]["Directory"][Creator.Service]}/{Creator.Name}'),
-											Hash=FilePath.stem,
-											Extension=FilePath.suffix
-										)
-										self.Data[Creator.Platform]['Posts'][Creator.Service].append(FileInfo)
-										if self.DownloadQueue.full():
-											self.Log.warning(f'Download Queue Full ({self.DownloadQueue.qsize()})')
-											break
-										else:
-											await self.DownloadQueue.put(FileInfo)
-										Counter += 1
-										self.TotalFiles += 1
-									else:
-										SkippedCounter += 1
-										CurrentSkipped += 1
-
-								for Attachment in Post.get('attachments', []):
-									if Attachment.get('path'):
-										FilePath = Path(Attachment['path'])
-										CurrentCounter += 1
-
-										if not any(str(FilePath.stem).startswith(Hash) for Hash in self.Hashes):
-											NewPostsCount += 1
-											FileInfo = FileData(
-												ID=Creator.ID,
-												Name=Creator.Name,
-												Url=f'{self.Data[Creator.Platform]["FileUrl"]}{Attachment["path"]}',
-												Path=Path(f'Data/{self.Data[Creator.Platform]["Directory"][Creator.Service]}/{Creator.Name}'),
-												Hash=FilePath.stem,
-												Extension=FilePath.suffix
-											)
-											self.Data[Creator.Platform]['Posts'][Creator.Service].append(FileInfo)
-											if self.DownloadQueue.full():
-												self.Log.warning(f'Download Queue Full ({self.DownloadQueue.qsize()})')
-												break
-											else:
-												await self.DownloadQueue.put(FileInfo)
-											Counter += 1
-											self.TotalFiles += 1
-										else:
-											SkippedCounter += 1
-											CurrentSkipped += 1
-
-							self.Log.debug(f'Fetched {CurrentCounter} Posts From {Creator.Name} On Page {Page} (New: {NewPostsCount}, Skipped: {CurrentSkipped})')
-
-							if NewPostsCount < MinNewPostsThreshold:
-								self.Log.info(f'Stopping Fetch For {Creator.Name} - Found Only {NewPostsCount} New Posts On Page {Page}')
-								return False
-
-							Page += 1
-							return True
-				except Exception as Error:
-					self.ErrorLogger(Error)
-					self.Log.warning(f'Failed To Fetch Posts From {Creator.Name}')
-					return False
-				return False
+		if Waiting := self.Negative.Waiting(Key(Creator)):
+			SkippedCreators.Inc(Platform=Creator.Platform)
+			self.Log.warning(f'Skipping {Creator.Name} For Another {Waiting / 3600:.1f}h After Repeated Failures')
+			return
+
+		Source = Kemono(self.Data[Creator.Platform]['FileUrl'], Creator.Service, Creator.ID, StartingPage * PageOffset)
+		Pages = Engine(functools.partial(self.Page, Creator)).Pages(Source, self.Skip, MinNew=MinNewPostsThreshold)
+		try:
+			async with aclosing(Pages):
+				async for Page in Pages:
+					if self.Stopped:
+						break
 
-		while not self.Stopped and await Fetch(Creator):
-			pass
+					Pending = [
+						FileData(
+							ID=Creator.ID,
+							Name=Creator.Name,
+							Url=Found.Url,
+							Path=self.CreatorPath(Creator),
+							Hash=Found.Hash,
+							Extension=Found.Extension,
+							Age=(Page.Cursor, Found.Position),
+							Platform=Creator.Platform
+						)
+						for Found in Page.Items
+					]
+					for Reason, Count in Page.Skipped.items():
+						SkippedFiles.Inc(Count, Reason=Reason)
+					SkippedCounter += Page.Skipped.total()
+
+					if DownloadQueue.Sizing:
+						await asyncio.gather(*(self.Probe(FileInfo) for FileInfo in Pending))
+
+					for FileInfo in Pending:
+						if self.Stopped:
+							break
+						if DownloadQueue.full():
+							self.Log.warning(f'Download Queue Full ({DownloadQueue.qsize()})')
+							break
+						else:
+							await DownloadQueue.put(FileInfo)
+						Counter += 1
+						self.TotalFiles += 1
+
+					self.Log.debug(f'Fetched {Page.Total} Posts From {Creator.Name} On Page {Page.Cursor // PageOffset} (New: {len(Pending)}, Skipped: {Page.Skipped.total()})')
+
+					if len(Pending) < MinNewPostsThreshold:
+						self.Log.info(f'Stopping Fetch For {Creator.Name} - Found Only {len(Pending)} New Posts On Page {Page.Cursor // PageOffset}')
+		except Exception as Error:
+			self.Negative.Failed(Key(Creator))
+			self.ErrorLogger(Error)
+			self.Log.warning(f'Failed To Fetch Posts From {Creator.Name}')
+
+		self.Cursors[Key(Creator)] = Source.Cursor // PageOffset
 
 		if not self.Stopped:
-			self.Log.info(f'Fetched {Counter} New Posts From {Creator.Name} After {Page} Pages (Skipped: {SkippedCounter})')
+			self.Log.info(f'Fetched {Counter} New Posts From {Creator.Name} After {Source.Cursor // PageOffset} Pages (Skipped: {SkippedCounter})')
 
 # Downloader Class
 class Downloader:
-	def __init__(self, Session: aiohttp.ClientSession,
+	def __init__(self, Lanes: Network, Disk: Writer, Proxies: ProxyPool,
 				 Log: logging.Logger, ErrorLogger: logging.Logger, Fetcher: Fetcher
 				) -> None:
 		self.Log = Log
 		self.ErrorLogger = ErrorLogger
-		self.Session = Session
-		self.Semaphore = asyncio.Semaphore(SemaphoreLimit)
+		self.Lanes = Lanes
+		self.Disk = Disk
+		self.Proxies = Proxies
+		self.Semaphores = defaultdict(lambda: asyncio.Semaphore(SemaphoreLimit))
 		self.TotalFiles = 0
 		self.Stopped = False
 		self.Fetcher = Fetcher
@@ -480,85 +638,101 @@ class Downloader:
 		self.InitialFreeSpace = shutil.disk_usage('.').free
 
 	#@retry(**RetryConfig)
-	async def FetchFile(self, Url: str, OutPath: Path) -> int:
-		try:
-			TotalSize = 0
-
-			async with self.Session.get(Url) as Response:
-				Response.raise_for_status()
-
-				async with aiofiles.open(OutPath, 'wb') as File:
-					async for chunk in Response.content.iter_chunked(int(ChunkSize)):
-						if self.Stopped:
-							return 0
-						await File.write(chunk)
-						TotalSize += len(chunk)
-			return TotalSize
-		except Exception as Error:
-			if any(isinstance(Error, ExceptionType) for ExceptionType in AiohttpExceptions):
-				return 0
-			elif any(isinstance(Error, ExceptionType) for ExceptionType in [BlockingIOError, RuntimeError]):
-				return 0
-			else:
-				self.ErrorLogger(Error)
+	async def FetchFile(self, Url: str, OutPath: Path, Length: int = 0, Expected: str = '') -> int:
+		Host = urlsplit(Url).hostname
+		if self.Lanes.Media.Circuit(Host).Blocked():
+			raise CircuitOpen(Host, self.Lanes.Media.Circuit(Host).Remaining())
+		for Attempt in range(2):
+			try:
+				TotalSize = 0
+				with Metrics.Timer(RequestSeconds, Host=Host, Lane='media'), self.Proxies.Lease(Direct=Attempt > 0) as Lease:
+					async with self.Lanes.Media.Get(Url, Proxy=Lease.Proxy.Url) as Response:
+						Response.raise_for_status()
+						Lease.Latency = time.perf_counter() - Lease.Start
+
+						async with self.Disk.Open(OutPath, Response.content_length or Length, Expected) as File:
+							async for chunk in Response.content.iter_any():
+								if self.Stopped:
+									return 0
+								await File.Write(chunk)
+								TotalSize += len(chunk)
+								Lease.Bytes = TotalSize
+								DownloadedBytes.Inc(len(chunk), Host=Host)
+							await File.Commit()
+				return TotalSize
+			except CircuitOpen:
+				raise
+			except Mismatch as Error:
+				CorruptFiles.Inc(Host=Host)
+				self.Log.warning(f'Rejected {OutPath.stem}... ({Error})') if not self.Stopped else None
+			except Exception as Error:
+				FailedRequests.Inc(Host=Host, Lane='media')
+				if isinstance(Error, aiohttp.ClientResponseError) and Lease.Proxy is self.Proxies.Direct:
+					self.Fetcher.Negative.Record(Url, Error.status)
+				if not any(isinstance(Error, ExceptionType) for ExceptionType in AiohttpExceptions + [BlockingIOError, RuntimeError]):
+					self.ErrorLogger(Error)
+			if self.Stopped or Lease.Proxy is self.Proxies.Direct:
 				return 0
+		return 0
 
 	async def Download(self, File: FileData) -> int:
 		if self.Stopped:
 			return 0
 
-		if random.random() < 0.1:
-			gc.collect()
-
-		async with self.Semaphore:
+		async with self.Semaphores[File.Platform]:
 			try:
 				if str(File.Hash) in self.Hashes:
+					SkippedFiles.Inc(Reason='duplicate')
+					FileResults.Inc(Status='skipped')
 					SpacePercentage = await self.CalculateSpacePercentage()
-					QueueStatus = f'[{self.Fetcher.DownloadQueue.qsize()}/{QueueLimit}]'
+					QueueStatus = f'[{self.Fetcher.DownloadQueues[File.Platform].qsize()}/{QueueLimit}]'
 					self.Log.warning(
 						f'{QueueStatus} ({SpacePercentage}) Skipping {File.Hash[:30]}... '
 					) if not self.Stopped else None
 					return 0
 
-				if shutil.disk_usage('.').free < LowDiskSpaceThreshold:
+				FreeSpace = (await asyncio.to_thread(shutil.disk_usage, '.')).free
+				if FreeSpace < LowDiskSpaceThreshold():
 					self.Log.warning('Low Disk Space!') if not self.Stopped else None
 					self.Stopped = True
 					self.Fetcher.Stopped = True
 					raise LowDiskSpace(f'Available Disk Space Below {await self.CalculateSpacePercentage()}')
 
+				if File.Size > FreeSpace - LowDiskSpaceThreshold():
+					SkippedFiles.Inc(Reason='budget')
+					FileResults.Inc(Status='skipped')
+					self.Log.warning(f'Skipping {File.Hash[:30]}... ({await Humanize(File.Size)} Exceeds Remaining Disk Budget)')
+					return 0
+
 				StartTime = asyncio.get_event_loop().time()
-				TempPath = TempDir / File.Path.relative_to('Data')
 				FinalPath = FinalDir / File.Path.relative_to('Data')
-				os.makedirs(TempPath, exist_ok=True)
-				os.makedirs(FinalPath, exist_ok=True)
+				await EnsureDirectories(FinalPath, *([TempDir / File.Path.relative_to('Data')] if self.Disk.Placement == 'rename' else []))
 
-				FileSize = await self.FetchFile(
-					File.Url,
-					TempPath / f'{File.Hash[:30]}{File.Extension}'
-				)
+				ActiveDownloads.Inc()
+				try:
+					FileSize = await self.FetchFile(
+						File.Url,
+						FinalPath / f'{File.Hash[:30]}{File.Extension}',
+						File.Size,
+						str(File.Hash)
+					)
+				finally:
+					ActiveDownloads.Dec()
+				FileResults.Inc(Status='downloaded' if FileSize > 0 else 'failed')
 
 				if FileSize > 0:
-					await aiofiles.os.makedirs(FinalPath, exist_ok=True)
-					try:
-						await aiofiles.os.rename(
-							TempPath / f'{File.Hash[:30]}{File.Extension}',
-							FinalPath / f'{File.Hash[:30]}{File.Extension}'
-						)
-					except FileNotFoundError:
-						SpacePercentage = await self.CalculateSpacePercentage()
-						QueueStatus = f'[{self.Fetcher.DownloadQueue.qsize()}/{QueueLimit}]'
-						self.Log.warning(f'{QueueStatus} ({SpacePercentage}) Failed To Move {File.Hash[:30]}...')
-						return 0
 					self.Hashes.add(str(File.Hash))
 					ElapsedTime = asyncio.get_event_loop().time() - StartTime
 					SpacePercentage = await self.CalculateSpacePercentage()
-					QueueStatus = f'[{self.Fetcher.DownloadQueue.qsize()}/{QueueLimit}]'
+					QueueStatus = f'[{self.Fetcher.DownloadQueues[File.Platform].qsize()}/{QueueLimit}]'
 					self.Log.info(
 						f'{QueueStatus} ({SpacePercentage}) Downloaded {File.Hash[:30]}... '
 						f'({await Humanize(FileSize)} in {ElapsedTime:.1f}s)'
 					) if not self.Stopped else None
 					return FileSize
 				return 0
+			except CircuitOpen:
+				raise
 			except Exception as Error:
 				if any(isinstance(Error, ExceptionType) for ExceptionType in AiohttpExceptions + [BlockingIOError, RuntimeError, RetryError]):
 					pass
@@ -566,16 +740,16 @@ class Downloader:
 					if not self.Stopped:
 						self.ErrorLogger(Error)
 						SpacePercentage = await self.CalculateSpacePercentage()
-						QueueStatus = f'[{self.Fetcher.DownloadQueue.qsize()}/{QueueLimit}]'
+						QueueStatus = f'[{self.Fetcher.DownloadQueues[File.Platform].qsize()}/{QueueLimit}]'
 						self.Log.warning(f'{QueueStatus} ({SpacePercentage}) Failed To Download {File.Hash[:30]}... ')
 				return 0
 
 	async def CalculateSpacePercentage(self) -> str:
-		CurrentFreeSpace = shutil.disk_usage('.').free
+		CurrentFreeSpace = (await asyncio.to_thread(shutil.disk_usage, '.')).free
 		UsedSpace = self.InitialFreeSpace - CurrentFreeSpace
 		if UsedSpace <= 0:
 			return '0.00%'
-		Percentage = min(100, (UsedSpace / (self.InitialFreeSpace - LowDiskSpaceThreshold)) * 100)
+		Percentage = min(100, (UsedSpace / (self.InitialFreeSpace - LowDiskSpaceThreshold())) * 100)
 		return f'{Percentage:.2f}%'
 
 async def Humanize(Bytes: int) -> str:
@@ -598,110 +772,373 @@ async def IncreaseFileDescriptorLimit():
 		except Exception as Error:
 			Log.warning(f'Failed To Increase File Descriptor Limit: {Error}')
 
-async def RecycleConnections(Session: aiohttp.ClientSession, Interval=60) -> None:
-	while True:
-		await asyncio.sleep(Interval)
-		Session.connector._cleanup()
-		gc.collect()
+def ReportStall(Lag: float, Stack) -> None:
+	Frame = next((Frame for Frame in reversed(Stack) if Frame.filename == __file__), Stack[-1])
+	Log.warning(f'Event Loop Blocked For {Lag * 1e3:.0f} ms At {Path(Frame.filename).name}:{Frame.lineno} ({Frame.name})')
+	Log.debug(''.join(traceback.format_list(Stack[-6:])))
+
+def ParseArguments() -> argparse.Namespace:
+	Parser = argparse.ArgumentParser(description='Download favorited creators from coomer and kemono')
+	Parser.add_argument('--shard', type=ParseShard, default=(0, 1), dest='Shard', metavar='INDEX/COUNT', help='Only process creators assigned to this shard, e.g. 0/4')
+	Parser.add_argument('--merge', type=Path, nargs='?', const=StateDir, dest='Merge', help='Merge shard state files from this directory into Merged.json and exit')
+	Parser.add_argument('--schedule', choices=DownloadScheduler.Policies, default='fifo', dest='Schedule', help='Download order: fifo, newest posts first, smallest files first (HEAD probe), fair share per creator, or a weighted mix')
+	Parser.add_argument('--deadline', type=float, dest='Deadline', help='Seconds this run may take, queued files are dropped --drain seconds before it and unfinished downloads are abandoned at it')
+	Parser.add_argument('--drain', type=float, default=300.0, dest='Drain', help='Seconds before the deadline to stop starting new downloads')
+	Parser.add_argument('--grace', type=float, default=30.0, dest='Grace', help='Seconds running downloads get to finish after SIGINT or SIGTERM')
+	Parser.add_argument('--proxies', type=Path, nargs='?', const=Path('proxies'), dest='Proxies', help='Route downloads through the best scoring proxies listed in the .txt files of this directory')
+	Parser.add_argument('--proxy-probe', dest='ProxyProbe', metavar='URL', help='Probe every proxy against this URL before downloading and drop the ones that fail')
+	Parser.add_argument('--no-cache', action='store_false', dest='Cache', help='Always fetch API pages in full instead of revalidating cached copies with ETag / Last-Modified')
+	Parser.add_argument('--rcd', action='store_true', dest='Rcd', help='List and create remote directories through one rclone rcd instead of starting rclone for every call')
+	Parser.add_argument('--pack', action='store_true', dest='Pack', help='Bundle small downloaded files of each creator into uncompressed tar archives with a hash index before upload')
+	Parser.add_argument('--pack-threshold', type=float, default=8.0, dest='PackThreshold', metavar='MB', help='Files smaller than this are packed')
+	Parser.add_argument('--pack-size', type=float, default=512.0, dest='PackSize', metavar='MB', help='Largest archive size')
+	Parser.add_argument('--workers', type=int, default=1, dest='Workers', help='Split creators across N processes, 0 uses every core')
+	Parser.add_argument('--metrics-port', type=int, dest='MetricsPort', help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+	Parser.add_argument('--metrics-file', type=Path, dest='MetricsFile', help='Periodically write Prometheus metrics to this file')
+	Parser.add_argument('--metrics-interval', type=float, default=5.0, dest='MetricsInterval', help='Seconds between metrics file writes')
+	Parser.add_argument('--profile', type=Path, nargs='?', const=Path('Data/Profile'), dest='Profile', help='Record per-stage timings and event loop lag, report written to this directory')
+	Parser.add_argument('--watchdog', type=float, default=0.0, dest='Watchdog', help='Log the blocking stack whenever the event loop stalls longer than N milliseconds')
+	Parser.add_argument('--profile-sample', type=float, default=0.0, dest='ProfileSample', help='Also sample the event loop stack every N milliseconds into Stacks.folded')
+	Args = Parser.parse_args()
+	Args.Workers = Args.Workers or os.cpu_count()
+	Args.Deadline = time.time() + Args.Deadline if Args.Deadline else None
+	return Args
+
+def Key(Creator: CreatorData) -> str:
+	return f'{Creator.Platform}/{Creator.Service}/{Creator.ID}'
+
+def ShardOf(Creator: CreatorData, Count: int, Salt: str = '') -> int:
+	return zlib.crc32(f'{Salt}{Key(Creator)}'.encode()) % Count
+
+def ParseShard(Value: str) -> Tuple[int, int]:
+	try:
+		Index, Count = map(int, Value.split('/'))
+	except ValueError:
+		raise argparse.ArgumentTypeError(f'Expected INDEX/COUNT, Got {Value!r}')
+	if not 0 <= Index < Count:
+		raise argparse.ArgumentTypeError(f'Shard Index Must Be Between 0 And {Count - 1}')
+	return Index, Count
+
+def WriteState(Target: Path, State: dict) -> None:
+	Target.parent.mkdir(parents=True, exist_ok=True)
+	Temporary = Target.with_name(f'.{Target.name}.tmp')
+	Temporary.write_bytes(Dumps(State, Indent=True))
+	os.replace(Temporary, Target)
+
+def LoadState(Directory: Path = StateDir) -> dict:
+	Target = Directory / 'Merged.json'
+	return Loads(Target.read_bytes()) if Target.exists() else {'Hashes': [], 'Cursors': {}, 'Files': 0, 'Bytes': 0, 'Shards': []}
+
+def MergeStates(Directory: Path = StateDir) -> dict:
+	Merged = LoadState(Directory)
+	Hashes = set(Merged['Hashes'])
+	Shards = sorted(Directory.rglob('Shard*.json'))
+	for File in Shards:
+		State = Loads(File.read_bytes())
+		Hashes.update(State['Hashes'])
+		Merged['Cursors'].update(State['Cursors'])
+		Merged['Files'] += State['Files']
+		Merged['Bytes'] += State['Bytes']
+		Log.info(f'Merged Shard {State["Shard"]}: {State["Files"]} Files, {len(State["Hashes"])} Hashes, {len(State["Cursors"])} Cursors')
+	Merged.update(Hashes=sorted(Hashes), Shards=[File.stem for File in Shards], Merged=time.time())
+	WriteState(Directory / 'Merged.json', Merged)
+	for File in Shards:
+		File.unlink()
+	return Merged
+
+def Sharded(Args: argparse.Namespace, Index: int) -> argparse.Namespace:
+	return argparse.Namespace(**{
+		**vars(Args),
+		'Workers': 1,
+		'MetricsPort': Args.MetricsPort + Index + 1 if Args.MetricsPort else None,
+		'MetricsFile': Args.MetricsFile.with_stem(f'{Args.MetricsFile.stem}.{Index}') if Args.MetricsFile else None,
+		'Profile': Args.Profile / f'Shard{Index}' if Args.Profile else None
+	})
+
+def Run(Coroutine):
+	return uvloop.run(Coroutine) if platform.system() == 'Linux' else asyncio.run(Coroutine)
+
+def CreateNetwork() -> Network:
+	return Network(ApiLimit=max(SemaphoreLimit // 2, 1), MediaLimit=SemaphoreLimit * 2, ApiTimeout=60.0, MediaTimeout=TimeoutConfig)
+
+@contextmanager
+def Trap(Callback) -> Iterator[None]:
+	Loop = asyncio.get_running_loop()
+	Signals = [signal.SIGINT, signal.SIGTERM] if platform.system() != 'Windows' else []
+	for Signal in Signals:
+		Loop.add_signal_handler(Signal, Callback)
+	try:
+		yield
+	finally:
+		for Signal in Signals:
+			Loop.remove_signal_handler(Signal)
 
-if __name__ == '__main__':
-	async def Main() -> None:
-		if platform.system() == 'Linux':
-			Log.info('Running On Linux, Enabling Special Features...')
-			await IncreaseFileDescriptorLimit()
-		Log.info(f'Low Disk Space Threshold: {await Humanize(LowDiskSpaceThreshold)}')
-		DownloadQueue = Queue(maxsize=QueueLimit)
-		FileSizeHistory = []
-
-		async def ProcessDownloads(Download: Downloader):
-			while True:
-				File = await DownloadQueue.get()
-				try:
-					FileSize = await Download.Download(File)
-					if FileSize:
-						FileSizeHistory.append(FileSize)
-				except Exception as Error:
-					ErrorLogger(Error)
-				finally:
-					DownloadQueue.task_done()
+async def Enforce(Args: argparse.Namespace, Fetch: Fetcher, Download: Downloader, Interrupted: asyncio.Event) -> None:
+	try:
+		await asyncio.wait_for(Interrupted.wait(), Args.Deadline - Args.Drain - time.time() if Args.Deadline else None)
+		Log.warning('Interrupted, Finishing Up And Keeping Completed Files...')
+	except TimeoutError:
+		Log.warning(f'Deadline In {Args.Drain:.0f}s, No Longer Starting New Downloads...')
+
+	Fetch.Stopped = True
+	Dropped = 0
+	for DownloadQueue in Fetch.DownloadQueues.values():
+		while not DownloadQueue.empty():
+			DownloadQueue.get_nowait()
+			DownloadQueue.task_done()
+			Dropped += 1
+	Log.warning(f'Dropped {Dropped} Queued Files') if Dropped else None
+
+	Until = min(filter(None, (Args.Deadline, time.time() + Args.Grace if Interrupted.is_set() else None)))
+	try:
+		await asyncio.wait_for(asyncio.Event().wait() if Interrupted.is_set() else Interrupted.wait(), max(0.0, Until - time.time()))
+	except TimeoutError:
+		pass
+	Log.warning(f'Abandoning {ActiveDownloads.Get():.0f} Unfinished Downloads') if ActiveDownloads.Get() else None
+	Download.Stopped = True
+
+@asynccontextmanager
+async def Instrument(Args: argparse.Namespace):
+	MetricsServer = await Metrics.Serve(Metrics.Default, Args.MetricsPort) if Args.MetricsPort else None
+	MetricsFlusher = asyncio.create_task(Metrics.Flush(Metrics.Default, Args.MetricsFile, Args.MetricsInterval)) if Args.MetricsFile else None
+	if MetricsServer:
+		Log.info(f'Serving Metrics On http://127.0.0.1:{Args.MetricsPort}/metrics')
+	Profile = Profiler(Args.Profile is not None, Args.Profile or Path('Data/Profile'), Args.ProfileSample / 1000, Args.Watchdog / 1000)
+	Profile.Start(ReportStall)
+	try:
+		yield Profile
+	finally:
+		if MetricsFlusher:
+			MetricsFlusher.cancel()
+			await asyncio.gather(MetricsFlusher, return_exceptions=True)
+		if MetricsServer:
+			await MetricsServer.cleanup()
+
+		if Report := await Profile.Stop():
+			for Name, Stage in sorted(Report['Stages'].items(), key=lambda Item: -Item[1]['Wall']):
+				Log.info(f'Stage {Name}: {Stage["Wall"]:.2f}s Wall, {Stage["Cpu"]:.2f}s Cpu, {Stage["Calls"]} Calls')
+			for Name, Span in sorted(Report['Spans'].items(), key=lambda Item: -Item[1]['Total']):
+				Log.info(f'Span {Name}: {Span["Calls"]} Calls, {Span["Total"]:.2f}s Total, {Span["P50"] * 1e3:.1f} ms P50, {Span["P95"] * 1e3:.1f} ms P95')
+			Log.info(f'Garbage Collection: {sum(Report["Gc"]["Collections"].values())} Collections, {Report["Gc"]["Total"] * 1e3:.1f} ms Total, {Report["Gc"]["Max"] * 1e3:.1f} ms Max')
+			Log.info(f'Event Loop Lag: {Report["Lag"]["Mean"] * 1e3:.1f} ms Mean, {Report["Lag"]["P99"] * 1e3:.1f} ms P99, {Report["Lag"]["Max"] * 1e3:.1f} ms Max')
+			Log.info(f'Profile Written To {Profile.Directory}')
+		Log.info(f'Event Loop Stalls Over {Args.Watchdog:.0f} ms: {sum(Profile.Watchdog.Stalls.values())}') if Profile.Watchdog else None
+
+async def Discover(Fetch: Fetcher, Profile: Profiler, Shard: Tuple[int, int] = (0, 1)) -> list[CreatorData]:
+	if rclone.is_installed():
+		async with Fetch.Rclone or nullcontext():
+			if Fetch.Rclone:
+				Log.info('Started rclone rcd For Remote Storage')
+
+			Log.info('Creating Directories...')
+			with Profile.Stage('CreateDirectories'):
+				await Fetch.CreateDirectories()
+
+			Log.info('Looking Up Hashes...')
+			with Profile.Stage('LookupHashes'):
+				await Fetch.LookupHashes()
+
+		if Fetch.Rclone:
+			Log.info(f'rclone rcd Answered {Fetch.Rclone.Calls} Calls')
 
-		TCPConnector = aiohttp.TCPConnector(
-			limit=SemaphoreLimit*2,
-			limit_per_host=8,
-			ssl=False,
-			enable_cleanup_closed=True,
-			force_close=True,
-			use_dns_cache=True,
-			ttl_dns_cache=30
-		)
+	Log.info('Fetching Favorites...')
+	with Profile.Stage('Favorites'):
+		await Fetch.Favorites()
 
-		Timeout = aiohttp.ClientTimeout(total=TimeoutConfig, connect=30.0, sock_connect=30.0, sock_read=TimeoutConfig)
+	State = await asyncio.to_thread(LoadState)
+	Fetch.Hashes.update(State['Hashes'])
+	if State['Hashes']:
+		Log.info(f'Loaded {len(State["Hashes"])} Hashes From {StateDir / "Merged.json"}')
 
-		async with aiohttp.ClientSession(connector=TCPConnector, timeout=Timeout,
-										trust_env=True, raise_for_status=False) as Session:
-			ConnectionsRecycler = asyncio.create_task(RecycleConnections(Session))
-			Fetch = Fetcher(Session, Log, ErrorLogger, DownloadQueue)
-			Download = Downloader(Session, Log, ErrorLogger, Fetch)
+	AllCreators = []
+	for Platform in Fetch.Data:
+		for Service in Fetch.Data[Platform]['Creators']:
+			AllCreators.extend(Fetch.Data[Platform]['Creators'][Service])
 
-			Download.Semaphore = asyncio.Semaphore(SemaphoreLimit)
+	Index, Count = Shard
+	if Count > 1:
+		Log.info(f'Shard {Index}/{Count}: {sum(ShardOf(Creator, Count) == Index for Creator in AllCreators)} Of {len(AllCreators)} Creators')
+		AllCreators = [Creator for Creator in AllCreators if ShardOf(Creator, Count) == Index]
+	return AllCreators
 
-			DownloadTasks = [
-				asyncio.create_task(ProcessDownloads(Download))
-				for _ in range(SemaphoreLimit * 2)
-			]
+async def Crawl(Args: argparse.Namespace, Profile: Profiler, Creators: list[CreatorData] = None, Hashes: set = frozenset()) -> dict:
+	Totals = {'Files': 0, 'Bytes': 0}
 
+	async def ProcessDownloads(Download: Downloader, DownloadQueue: DownloadScheduler):
+		while True:
+			File = await DownloadQueue.get()
 			try:
-				Log.info('Creating Directories...')
-				await Fetch.CreateDirectories()
+				with Profile.Span('Download'):
+					FileSize = await Download.Download(File)
+				if FileSize:
+					Totals['Files'] += 1
+					Totals['Bytes'] += FileSize
+			except CircuitOpen as Error:
+				await Defer(File, Error, DownloadQueue)
+			except Exception as Error:
+				ErrorLogger(Error)
+			finally:
+				DownloadQueue.task_done()
 
-				Log.info('Looking Up Hashes...')
-				await Fetch.LookupHashes()
+	async def Defer(File: FileData, Error: CircuitOpen, DownloadQueue: DownloadScheduler) -> None:
+		File.Deferrals += 1
+		if not Fetch.Stopped and File.Deferrals <= MaxDeferrals and not DownloadQueue.full():
+			DownloadQueue.put_nowait(File)
+			Log.debug(f'{Error}, Deferring {File.Hash[:30]}...')
+		else:
+			SkippedFiles.Inc(Reason='circuit')
+			FileResults.Inc(Status='skipped')
+		await Fetch.Hold(Lanes.Media, Error.Host)
+
+	Interrupted = asyncio.Event()
+	async with CreateNetwork() as Lanes, Writer(TempDir, FinalDir, Size=ChunkSize) as Disk:
+		Log.info(f'Placing Files Via {Disk.Placement.capitalize()}')
+		Fetch = Fetcher(Lanes, Log, ErrorLogger, Args.Schedule, Args.Cache, Daemon() if Args.Rcd else None)
+		Pool = ProxyPool()
+		if Args.Proxies:
+			Log.info(f'Loaded {Pool.Load(Args.Proxies)} Proxies From {Args.Proxies}')
+			if Args.ProxyProbe:
+				with Profile.Stage('ProbeProxies'):
+					Passed = await Pool.Probe(Lanes.Media, Args.ProxyProbe)
+					Fastest = [f'{Current} ({await Humanize(Current.Score)}/s)' for Current in Pool.Best(3)]
+					Log.info(f'{Passed} Proxies Passed The Probe, Fastest: {", ".join(Fastest)}')
+		Download = Downloader(Lanes, Disk, Pool, Log, ErrorLogger, Fetch)
+		Metrics.Default.Collector(lambda: (ProxyCount.Set(len(Pool.Healthy()), State='healthy'), ProxyCount.Set(len(Pool.Proxies) - ProxyCount.Get(State='healthy'), State='ejected')))
+		Fetch.Hashes.update(Hashes)
+		Metrics.Default.Collector(lambda: [(ConnectionPools.Set(len(Lane.Pools), Lane=Lane.Name), PoolRotations.Set(Lane.Rotations, Lane=Lane.Name)) for Lane in Lanes.Lanes()])
+		Metrics.Default.Collector(lambda: [(CircuitState.Set(States.index(Circuit.State), Host=Host), CircuitTrips.Set(Circuit.Opened, Host=Host)) for Host, Circuit in Lanes.Breakers.items()])
+		Metrics.Default.Collector(lambda: [QueueDepth.Set(DownloadQueue.qsize(), Platform=Platform) for Platform, DownloadQueue in Fetch.DownloadQueues.items()])
+
+		DownloadTasks = [
+			asyncio.create_task(ProcessDownloads(Download, DownloadQueue))
+			for DownloadQueue in Fetch.DownloadQueues.values()
+			for _ in range(SemaphoreLimit * 2)
+		]
+		Enforcer = asyncio.create_task(Enforce(Args, Fetch, Download, Interrupted))
+
+		with Trap(Interrupted.set):
+			try:
+				if Creators is None:
+					Creators = await Discover(Fetch, Profile, Args.Shard)
+					Hashes = set(Fetch.Hashes)
 
-				Log.info('Fetching Favorites...')
-				await Fetch.Favorites()
+				with Profile.Stage('CreateLocalDirectories'):
+					await EnsureDirectories(*(Root / Fetch.CreatorPath(Creator).relative_to('Data') for Creator in Creators for Root in ((TempDir, FinalDir) if Disk.Placement == 'rename' else (FinalDir,))))
 
-				Log.info('Fetching Posts...')
-				AllCreators = []
-				for Platform in Fetch.Data:
-					for Service in Fetch.Data[Platform]['Creators']:
-						AllCreators.extend(Fetch.Data[Platform]['Creators'][Service])
+				Log.info(f'Fetching Posts From {len(Creators)} Creators...')
 
-				random.shuffle(AllCreators)
+				random.shuffle(Creators)
 
-				for Creator in AllCreators:
-					if Fetch.Stopped:
-						break
-					await Fetch.Posts(Creator)
+				async def Walk(Platform: str) -> None:
+					for Creator in Creators:
+						if Fetch.Stopped:
+							break
+						if Creator.Platform == Platform:
+							with Profile.Span('Posts'):
+								await Fetch.Posts(Creator)
+
+				await asyncio.gather(*(Walk(Platform) for Platform in Fetch.Data))
+
+				Log.info('Waiting For Downloads...')
+				with Profile.Stage('Drain'):
+					await asyncio.gather(*(DownloadQueue.join() for DownloadQueue in Fetch.DownloadQueues.values()))
 
 			finally:
 				Log.info('Shutting Down Tasks...')
-				ConnectionsRecycler.cancel()
+				Enforcer.cancel()
 
 				for Task in DownloadTasks:
 					Task.cancel()
 
-				await asyncio.gather(*DownloadTasks, ConnectionsRecycler, return_exceptions=True)
-
+				await asyncio.gather(*DownloadTasks, Enforcer, return_exceptions=True)
+				await asyncio.to_thread(Fetch.Negative.Save)
+				Removed, Freed = await asyncio.to_thread(Fetch.Cache.Prune)
+				Log.info(f'Pruned {Removed} Cached Pages ({Freed / 1048576:.1f} MB)') if Removed else None
+
+	return {'Hashes': Fetch.Hashes.difference(Hashes), 'Cursors': Fetch.Cursors, **Totals}
+
+async def Shard(Args: argparse.Namespace, Creators: list[CreatorData], Hashes: set) -> dict:
+	async with Instrument(Args) as Profile:
+		return await Crawl(Args, Profile, Creators, Hashes)
+
+def Worker(Args: argparse.Namespace, Index: int, Creators: list[CreatorData], Hashes: set) -> dict:
+	InitLogging()
+	return Run(Shard(Sharded(Args, Index), Creators, Hashes))
+
+async def Distribute(Args: argparse.Namespace, Profile: Profiler) -> dict:
+	async with CreateNetwork() as Lanes:
+		Fetch = Fetcher(Lanes, Log, ErrorLogger, Caching=Args.Cache, Rclone=Daemon() if Args.Rcd else None)
+		Creators = await Discover(Fetch, Profile, Args.Shard)
+
+	Shards = [[Creator for Creator in Creators if ShardOf(Creator, Args.Workers, 'Worker') == Index] for Index in range(Args.Workers)]
+	Log.info(f'Sharding {len(Creators)} Creators Across {Args.Workers} Workers ({", ".join(str(len(Shard)) for Shard in Shards)})')
+
+	Loop = asyncio.get_running_loop()
+	Forward = lambda: [os.kill(Child.pid, signal.SIGTERM) for Child in multiprocessing.active_children()]
+	with Profile.Stage('Workers'), ProcessPoolExecutor(Args.Workers, mp_context=multiprocessing.get_context('spawn')) as Pool, Trap(Forward):
+		Results = await asyncio.gather(*(
+			Loop.run_in_executor(Pool, Worker, Args, Index, Shard, Fetch.Hashes)
+			for Index, Shard in enumerate(Shards)
+		), return_exceptions=True)
+
+	Merged = {'Hashes': set(), 'Cursors': {}, 'Files': 0, 'Bytes': 0}
+	for Index, Result in enumerate(Results):
+		if isinstance(Result, BaseException):
+			Log.warning(f'Worker {Index} Failed: {Result!r}')
+			continue
+		Log.info(f'Worker {Index}: {Result["Files"]} Files ({await Humanize(Result["Bytes"])})')
+		Merged['Hashes'].update(Result['Hashes'])
+		Merged['Cursors'].update(Result['Cursors'])
+		Merged['Files'] += Result['Files']
+		Merged['Bytes'] += Result['Bytes']
+	return Merged
+
+async def Main(Args: argparse.Namespace) -> None:
+	if platform.system() == 'Linux':
+		Log.info('Running On Linux, Enabling Special Features...')
+		await IncreaseFileDescriptorLimit()
+	Log.info(f'Low Disk Space Threshold: {await Humanize(LowDiskSpaceThreshold())}')
+	Log.info('Rclone Is Installed' if rclone.is_installed() else 'Rclone Is Not Installed.')
+
+	async with Instrument(Args) as Profile:
+		Result = await Distribute(Args, Profile) if Args.Workers > 1 else await Crawl(Args, Profile)
+		Log.info(f'Downloaded {Result["Files"]} Files ({await Humanize(Result["Bytes"])})')
+
+		Index, Count = Args.Shard
+		await asyncio.to_thread(WriteState, StateDir / f'Shard{Index}-{Count}.json', {
+			'Shard': f'{Index}/{Count}',
+			'Finished': time.time(),
+			'Files': Result['Files'],
+			'Bytes': Result['Bytes'],
+			'Hashes': sorted(Result['Hashes']),
+			'Cursors': Result['Cursors']
+		})
+
+		if Args.Pack:
+			with Profile.Stage('Pack'):
+				Packed = await asyncio.to_thread(Pack, FinalDir, int(Args.PackThreshold * 2**20), int(Args.PackSize * 2**20))
+			Log.info(f'Packed {Packed["Files"]} Small Files ({await Humanize(Packed["Bytes"])}) Into {Packed["Archives"]} Archives')
+
+		with Profile.Stage('CountFiles'):
 			FileCount = sum(1 for _ in Path(FinalDir).rglob('*') if _.is_file())
-			OptimalTransfers = await CalculateTransfers(FileCount)
+		OptimalTransfers = await CalculateTransfers(FileCount)
 
-			async with aiofiles.open('Data/Transfers.txt', 'w') as F:
-				await F.write(str(OptimalTransfers))
-			Log.info(f'Optimal Rclone Transfers: {OptimalTransfers} (Based On {FileCount} Files)')
+		async with aiofiles.open('Data/Transfers.txt', 'w') as F:
+			await F.write(str(OptimalTransfers))
+		Log.info(f'Optimal Rclone Transfers: {OptimalTransfers} (Based On {FileCount} Files)')
+
+if __name__ == '__main__':
+	InitLogging()
+	Arguments = ParseArguments()
+	if Arguments.Merge:
+		Merged = MergeStates(Arguments.Merge)
+		Log.info(f'Merged State Holds {len(Merged["Hashes"])} Hashes And {len(Merged["Cursors"])} Cursors')
+		sys.exit(0)
 
 	try:
-		if platform.system() == 'Linux':
-			uvloop.run(Main())
-		else:
-			asyncio.run(Main())
+		Run(Main(Arguments))
 	except KeyboardInterrupt:
 		Log.info('Exiting...')
-		for File in TempDir.iterdir():
-			try:
-				Log.info(f'Deleting {File.name}')
-				File.unlink()
-			except Exception as Error:
-				ErrorLogger(Error)
 		sys.exit(0)
 	except LowDiskSpace as Error:
 		Log.warning(Error)
@@ -713,14 +1150,12 @@ if __name__ == '__main__':
 			ErrorLogger(Error)
 		sys.exit(1)
 	finally:
-		for Dir in [TempDir, FinalDir]:
-			if Dir.exists():
-				for File in Dir.iterdir():
-					try:
-						if File.is_file():
-							Log.info(f'Deleting {File.name}')
-							File.unlink(missing_ok=True)
-					except PermissionError:
-						Log.warning(f'Permission denied deleting {File}')
-					except Exception as Error:
-						ErrorLogger(Error)
+		for File in itertools.chain(TempDir.rglob('*'), FinalDir.rglob('*.partial')):
+			try:
+				if File.is_file():
+					Log.info(f'Deleting Partial {File.name}')
+					File.unlink(missing_ok=True)
+			except PermissionError:
+				Log.warning(f'Permission denied deleting {File}')
+			except Exception as Error:
+				ErrorLogger(Error)
@@ -1,13 +1,16 @@
 from rich.console import Console
 from dotenv import load_dotenv
 from httpx import HTTPError
+from Parser import Loads, Dumps, DecodeError
+from Engine import Engine, Kemono, Rule34, E621
+from Writer import Hasher
+from Cache import ResponseCache, NegativeCache
 from typing import Dict
 import urllib.parse
 import aiofiles.os
 import aiofiles
 import asyncio
 import httpx
-import json
 import os
 
 from rich.progress import Progress, BarColumn, TimeElapsedColumn
@@ -16,6 +19,13 @@ load_dotenv()
 
 LOG_LEVEL = 0  # 0: Debug, 1: Info, 2: Warning, 3: Error, 4: Critical
 
+Hosts = {
+    'coomer': os.getenv('COOMER_URL', 'https://coomer.su'),
+    'kemono': os.getenv('KEMONO_URL', 'https://kemono.su'),
+    'rule34': os.getenv('RULE34_URL', 'https://api.rule34.xxx'),
+    'e621': os.getenv('E621_URL', 'https://e621.net')
+}
+
 class RichLogger:
     def __init__(self, Name=__name__):
         self.Console = Console(
@@ -57,15 +67,17 @@ class RichLogger:
 Logger = RichLogger(__name__)
 
 async def ReadConfig():
-    async with aiofiles.open('config.json', 'r', encoding='utf-8') as f:
-        return json.loads(await f.read())
+    async with aiofiles.open('config.json', 'rb') as f:
+        return Loads(await f.read())
 
-Config = asyncio.run(ReadConfig())
+Config = {}
+Cache = ResponseCache()
+Negative = NegativeCache()
 
 class FavoriteFetcher:
     def __init__(self, Platform):
         self.Platform = Platform
-        self.Url = f'https://{Platform}.su/api/v1/account/favorites?type=artist'
+        self.Url = f'{Hosts[Platform]}/api/v1/account/favorites?type=artist'
 
     @classmethod
     async def Create(cls, Platform):
@@ -85,14 +97,14 @@ class FavoriteFetcher:
             Client.cookies.set(
                 'session',
                 os.getenv('COOMER_SESS') if self.Platform == 'coomer' else os.getenv('KEMONO_SESS'),
-                domain=f'{self.Platform}.su',
+                domain=urllib.parse.urlparse(Hosts[self.Platform]).hostname,
                 path='/'
             )
 
             Response = await Client.get(self.Url)
             
             if Response.status_code == 200:
-                Data = Response.json()
+                Data = Loads(Response.content)
 
                 for Service in ['onlyfans', 'fansly', 'patreon', 'subscribestar', 'fanbox', 'gumroad']:
                     if 'ids' not in Config[Service]:
@@ -141,12 +153,19 @@ class AsyncDownloader:
     async def Download(self):
         global SentRequestInfo
         try:
-            Response = await self.Client.get(self.Url)
+            async with self.Client.stream('GET', self.Url) as Response:
+                if Response.status_code == 200:
+                    Digest = Hasher(self.Hash)
+                    async with aiofiles.open(self.PartialPath, 'wb') as f:
+                        async for Chunk in Response.aiter_bytes(1 << 20):
+                            if Digest:
+                                await asyncio.to_thread(Digest.update, Chunk)
+                            await f.write(Chunk)
             if Response.status_code == 200:
-                # Download to .partial file first
-                async with aiofiles.open(self.PartialPath, 'wb') as f:
-                    await f.write(Response.content)
-                
+                if Digest and Digest.hexdigest() != self.Hash.lower():
+                    Logger.Warning(f'Hash mismatch for {self.Hash}, got {Digest.hexdigest()}')
+                    return False
+
                 try:
                     # Rename to final filename if download successful
                     if os.path.exists(self.PartialPath):
@@ -159,6 +178,7 @@ class AsyncDownloader:
                         os.remove(self.PartialPath)
                     return False
             else:
+                Negative.Record(self.Url, Response.status_code)
                 Logger.Debug(f'Failed to download {self.Hash} from {self.Url} ({Response.status_code}) ({self.Client.headers}) ({self.Client.cookies}) ({self.Client.base_url})') if not SentRequestInfo else None
                 SentRequestInfo = True
                 return False
@@ -185,13 +205,12 @@ class HashManager:
     async def LoadCache(self):
         '''Load cached hashes from the cache file.'''
         try:
-            async with aiofiles.open(self.CacheFile, 'r') as f:
-                Content = await f.read()
-                self.CachedHashes = json.loads(Content)
+            async with aiofiles.open(self.CacheFile, 'rb') as f:
+                self.CachedHashes = Loads(await f.read())
                 TotalHashes = sum(len(Hashes) for Platform in self.CachedHashes.values() 
                                 for Hashes in Platform.values())
                 Logger.Debug(f'∙ Loaded {TotalHashes} cached hashes')
-        except (FileNotFoundError, json.JSONDecodeError):
+        except (FileNotFoundError, DecodeError):
             self.CachedHashes = {}
             Logger.Debug('∙ No existing cache found, starting fresh')
 
@@ -213,20 +232,19 @@ class HashManager:
                     self.CachedHashes[Platform][Creator].extend(Hashes)
                     Logger.Debug(f'Added {len(Hashes)} hashes for {Platform}/{Creator}')
             
-            async with aiofiles.open(self.CacheFile, 'w') as f:
-                await f.write(json.dumps(self.CachedHashes, indent=4))
+            async with aiofiles.open(self.CacheFile, 'wb') as f:
+                await f.write(Dumps(self.CachedHashes, Indent=True))
             
         except Exception as e:
             Logger.Error(f'Failed to save hashes: {str(e)}')
             Console(force_terminal=True).print_exception(max_frames=1)
     
-    async def HasHash(self, Platform: str, Creator: str, Hash: str) -> bool:
-        '''Check if a hash is already cached.'''
-        return Hash in self.CachedHashes.get(Platform, {}).get(Creator, [])
+    def Known(self, Platform: str, Creator: str) -> set:
+        '''Cached hashes of a creator as a set, built once per creator instead of scanning the list per file.'''
+        return set(self.CachedHashes.get(Platform, {}).get(Creator, []))
 
 class Fetcher:
     def __init__(self, Platform, Id, Name, DirectoryName, HashManager, CreatorLimit, GlobalLimit):
-        self.Page = 0
         self.Client = httpx.AsyncClient()
         
         # Rest of init remains same
@@ -242,43 +260,31 @@ class Fetcher:
         self.HashManager = HashManager
         self.LastPage = 0  # Track last visited page
 
-        self.Params = None
-
         if self.Platform == 'rule34':
-            self.Params = {
-                'page': 'dapi',
-                's': 'post',
-                'q': 'index',
-                'json': '1',
-                'tags': self.Id,
-                'pid': self.Page,
-                'limit': 1000  # Rule34 max is 1000 per page
-            }
+            self.Source = Rule34(Hosts['rule34'], self.Id)
         elif self.Platform == 'e621':
-            self.Params = {
-                'limit': 320,  # e621 max is 320 per page
-                'tags': self.Id,
-                'page': self.Page,
-                'login': os.getenv('E621_LOGIN'),
-                'api_key': os.getenv('E621_API_KEY')
-            }
-
-        self.ParamsLimit = self.Params['limit'] if self.Params else 0
-        self.Params = urllib.parse.urlencode(self.Params, safe='+') if self.Platform in ['rule34', 'e621'] else self.Params  # Avoid '+' encoding in params
-
-    def ExtractHash(self, Url):  # Extract hash from URL / <hash> .png
-        if not Url:
-            return None
-        # Extract the filename from the URL and split on last dot
-        Filename = Url.split('/')[-1]
-        return Filename.rsplit('.', 1)[0]
-
-    async def FetchUrl(self, Url: str, Params: Dict = None) -> Dict:
+            self.Source = E621(Hosts['e621'], self.Id, Login=os.getenv('E621_LOGIN'), Key=os.getenv('E621_API_KEY'))
+        else:
+            self.Source = Kemono(Hosts['coomer' if self.Platform in ['onlyfans', 'fansly'] else 'kemono'], self.Platform, self.Id, Suffix='')
+
+        self.MinNew = 0 if isinstance(self.Source, Kemono) else self.Source.Size
+
+    async def FetchUrl(self, Url: str, Params: Dict = None):
         try:
-            Response = await self.Client.get(Url, params=Params, timeout=30.0)
+            Key = str(self.Client.build_request('GET', Url, params=Params).url)
+            Response = await self.Client.get(Url, params=Params, headers=await Cache.Headers(Key), timeout=30.0)
+            if Response.status_code == 304:
+                Body = await Cache.Body(Key)
+                if Body is not None:
+                    Negative.Succeeded(f'{self.Platform}/{self.Id}')
+                    return 200, Body
+                Response = await self.Client.get(Url, params=Params, timeout=30.0)
             if Response.status_code == 200:
-                return Response.json(), Response.status_code
-            return None, Response.status_code
+                Negative.Succeeded(f'{self.Platform}/{self.Id}')
+                await Cache.Store(Key, Response.headers, Response.content)
+                return Response.status_code, Response.content
+            Negative.Failed(f'{self.Platform}/{self.Id}')
+            return Response.status_code, None
         except HTTPError as e:
             Logger.Warning(f'HTTP error while fetching {Url}: {str(e)}')
             return None, None
@@ -286,203 +292,33 @@ class Fetcher:
             Logger.Error(f'Error occurred while fetching {Url}: {e}')
             return None, None
 
+    def Skip(self, Item):
+        if Negative.Failing(Item.Url):
+            return 'failing'
+        return 'known' if Item.Hash in self.Known else ''
+
     async def Scrape(self):
         #Logger.Debug(f'\n∙ Scraping {self.Platform} for {self.Name}')
         #Logger.Debug(f'∙ Creator Limit: {self.CreatorLimit} | Global Limit: {self.GlobalLimit}\n')
-        if self.Platform == 'rule34':
-            BaseParams = dict(urllib.parse.parse_qsl(self.Params))
-            while self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                BaseParams['pid'] = self.Page
-                self.LastPage = self.Page + 1  # Rule34 uses 0-based indexing
-                ReEncodedParams = urllib.parse.urlencode(BaseParams, safe='+')
-                Response, StatusCode = await self.FetchUrl('https://api.rule34.xxx/index.php', ReEncodedParams)
-                
-                try:
-                    _ = 0
-                    if Response:
-                        #Logger.Debug(f'∙ Got {len(Response)} posts for {self.Platform}/{self.Name}')
-                        Data = Response
-                        if not Data or (isinstance(Data, list) and len(Data) == 0):
-                            #Logger.Error(f'No data at page {self.Page+1}')
-                            break
-                        
-                        for Post in Data:
-                            if self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                                FileUrl = Post.get('file_url')
-                                FileHash = self.ExtractHash(FileUrl)
-
-                                if FileHash and await self.HashManager.HasHash(self.Platform, self.Id, FileHash):
-                                    #Logger.Debug(f'∙ Skipping {FileHash} as it is already cached')
-                                    continue
-
-                                if FileHash:
-                                    #Logger.Debug(f'∙ Found New File {FileHash[:40]}⋯ At Page {self.Page+1}')
-                                    FileData = [FileHash, FileUrl, f'{self.DirectoryName}/{FileHash}{os.path.splitext(FileUrl)[1]}']
-                                    self.Result[self.Platform][self.Id].append(FileData)
-                                    self.GlobalLimit -= 1
-                                    self.CreatorLimit -= 1
-                                    self.FilesDownloaded += 1
-                                    _ += 1
-                        
-                        if _ < self.ParamsLimit:
-                            #Logger.Info(f'Page {self.Page+1} → {_} files')
-                            break
-                        #Logger.Info(f'Page {self.Page+1} → {self.FilesDownloaded} files')
-                    else:
-                        if StatusCode != 200:
-                            #Logger.Error(f'No response or bad status ({StatusCode}) at page {self.Page+1}')
-                            #Logger.Error(f'Params: {ReEncodedParams}')
-                            #Logger.Error(f'URL: {Response.url}')
-                            break
-                        else:
-                            #Logger.Error(f'No data at page {self.Page+1}')
-                            break
-                except Exception:
-                    #Logger.Error(f'Error processing page {self.Page+1}: {e}')
-                    break
-
-                self.Page += 1
-
-        ############################################################
-        #                                                          #
-        #                           e621                           #
-        #                                                          #
-        ############################################################
-
-        elif self.Platform == 'e621':
-            BaseParams = dict(urllib.parse.parse_qsl(self.Params))
-            while self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                BaseParams['page'] = self.Page + 1
-                self.LastPage = self.Page + 1  # e621 uses 1-based indexing
-                ReEncodedParams = urllib.parse.urlencode(BaseParams, safe='+')
-                Response, StatusCode = await self.FetchUrl('https://e621.net/posts.json', ReEncodedParams)
-                
-                try:
-                    if Response and 'posts' in Response:
-                        #Logger.Debug(f'∙ Got {len(Response)} posts for {self.Platform}/{self.Name}')
-                        Posts = Response['posts']
-                        if not Posts or len(Posts) == 0:
-                            break
-
-                        _ = 0
-                        for Post in Posts:
-                            if self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                                FileUrl = Post.get('file', {}).get('url')  # Nested file URL
-                                if not FileUrl:
-                                    continue
-                                    
-                                FileHash = self.ExtractHash(FileUrl)
-                                if FileHash and await self.HashManager.HasHash(self.Platform, self.Id, FileHash):
-                                    #Logger.Debug(f'∙ Skipping {FileHash} as it is already cached')
-                                    continue
-
-                                if FileHash:
-                                    #Logger.Debug(f'∙ Found New File {FileHash[:40]}⋯ At Page {self.Page+1}')
-                                    FileData = [FileHash, FileUrl, f'{self.DirectoryName}/{FileHash}{os.path.splitext(FileUrl)[1]}']
-                                    self.Result[self.Platform][self.Id].append(FileData)
-                                    self.GlobalLimit -= 1
-                                    self.CreatorLimit -= 1
-                                    self.FilesDownloaded += 1
-                                    _ += 1
-
-                        if _ < self.ParamsLimit:
-                            #Logger.Info(f'Page {self.Page+1} → {_} files')
-                            break
-
-                        #Logger.Info(f'Page {self.Page+1} → {self.FilesDownloaded} files')
-                    else:
-                        #Logger.Error(f'No response or bad status ({StatusCode}) at page {self.Page+1}')
-                        break
-                        
-                except Exception:
-                    #Logger.Error(f'Error processing page {self.Page+1}: {e}')
-                    break
-
-                self.Page += 1
-
-        ############################################################
-        #                                                          #
-        #                Onlyfans, Fansly, Patreon                 #
-        #              SubscribeStar, Gumroad, Fanbox              #
-        #                                                          #
-        ############################################################
+        if Waiting := Negative.Waiting(f'{self.Platform}/{self.Id}'):
+            Logger.Warning(f'Skipping {self.Name} for another {Waiting / 3600:.1f}h after repeated failures')
+            await self.Client.aclose()
+            return self.GlobalLimit, self.Result, self.LastPage
 
-        else:
-            Hoster = 'coomer' if self.Platform in ['onlyfans', 'fansly'] else 'kemono'
-            while self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                self.LastPage = self.Page  # These platforms use offset-based pagination
-                Response, StatusCode = await self.FetchUrl(f'https://{Hoster}.su/api/v1/{self.Platform}/user/{self.Id}?o={self.Page}')
-                
-                try:
-                    if Response and isinstance(Response, list):  # Change here - response is a list     
-                        #Logger.Debug(f'∙ Got {len(Response)} posts for {self.Platform}/{self.Name}')
-                        _ = 0
-                        for Post in Response:
-                            if self.GlobalLimit > 0 and self.CreatorLimit > 0:
-                                # Handle attachments
-                                for Attachment in Post.get('attachments', []):
-                                    if self.GlobalLimit <= 0 or self.CreatorLimit <= 0:
-                                        break
-                                        
-                                    FileUrl = f'https://{Hoster}.su{Attachment.get('path')}'
-                                    FileHash = self.ExtractHash(FileUrl)
-                                    
-                                    if FileHash and await self.HashManager.HasHash(self.Platform, self.Id, FileHash):
-                                        #Logger.Debug(f'∙ Skipping {FileHash} as it is already cached')
-                                        continue
-
-                                    if FileHash:
-                                        FileData = [FileHash, FileUrl, f'{self.DirectoryName}/{FileHash}{os.path.splitext(FileUrl)[1]}']
-                                        self.Result[self.Platform][self.Id].append(FileData)
-                                        self.GlobalLimit -= 1
-                                        self.CreatorLimit -= 1
-                                        self.FilesDownloaded += 1
-                                        _ += 1
-
-                                # Handle main file
-                                File = Post.get('file', {})
-                                if File:
-                                    FileUrl = f'https://{Hoster}.su{File.get('path')}'
-                                    FileHash = self.ExtractHash(FileUrl)
-                                    
-                                    if FileHash and await self.HashManager.HasHash(self.Platform, self.Id, FileHash):
-                                        #Logger.Debug(f'∙ Skipping {FileHash} as it is already cached')
-                                        continue
-
-                                    if FileHash:
-                                        #Logger.Debug(f'∙ Found New File {FileHash[:40]}⋯')
-                                        FileData = [FileHash, FileUrl, f'{self.DirectoryName}/{FileHash}{os.path.splitext(FileUrl)[1]}']
-                                        self.Result[self.Platform][self.Id].append(FileData)
-                                        self.GlobalLimit -= 1
-                                        self.CreatorLimit -= 1 
-                                        self.FilesDownloaded += 1
-                                        _ += 1
-
-                        #Logger.Info(f'Found {_} files')
-
-                    else:
-                        #Logger.Error(f'No response or bad status ({StatusCode})')
-                        break
-
-                    if _ < self.ParamsLimit:
-                        #Logger.Info(f'Page {self.Page} → {_} files')
-                        break
-
-                    #Logger.Info(f'Page {self.Page} → {self.FilesDownloaded} files')
-                        
-                except Exception:
-                    #Logger.Error(f'Error processing page: {e}')
-                    break
-
-                self.Page += 50
-
-        if self.GlobalLimit <= 0:
-            #Logger.Info('Global limit reached')
-            pass
-        if self.CreatorLimit <= 0:
-            #Logger.Info(f'Creator limit reached for {self.Name}')
+        self.Known = self.HashManager.Known(self.Platform, self.Id)
+        try:
+            async for Item in Engine(self.FetchUrl).Files(self.Source, self.Skip, min(self.GlobalLimit, self.CreatorLimit), self.MinNew):
+                FileData = [Item.Hash, Item.Url, f'{self.DirectoryName}/{Item.Hash}{Item.Extension}']
+                self.Result[self.Platform][self.Id].append(FileData)
+                self.GlobalLimit -= 1
+                self.CreatorLimit -= 1
+                self.FilesDownloaded += 1
+        except Exception:
+            #Logger.Error(f'Error processing page {self.Source.Last}: {e}')
             pass
 
+        self.LastPage = self.Source.Last
+
         await self.Client.aclose()
         return self.GlobalLimit, self.Result, self.LastPage
 
@@ -541,7 +377,8 @@ def HumanizeBytes(Bytes):
     i = int((Bytes).bit_length() / 10)
     return f'{round(Bytes / (1 << (i * 10)), 2)} {Sizes[i]}'
 
-Screen = rf'''
+def Banner():
+    return rf'''
 
  __   __     ______     ______     ______   ______     __   __     ______    
 /\ `-.\ \   /\  ___\   /\  __ \   /\  ___\ /\  __ \   /\ `-.\ \   /\  ___\   
@@ -565,7 +402,9 @@ Screen = rf'''
 Manager = HashManager()  # Single instance to be reused
 
 async def Main():
-    Console(force_terminal=True).print(Screen)
+    Config.update(await ReadConfig())
+    await asyncio.to_thread(Negative.Load)
+    Console(force_terminal=True).print(Banner())
     CheckForDuplicateIds()
 
     Logger.Debug('Fetching Creators:')
@@ -771,6 +610,9 @@ async def Main():
                     Logger.Debug(f'∙ {Platform}/{Creator}: {Hashes}')
                     await Manager.SaveHashes({Platform: {Creator: Hashes}})
 
+        await asyncio.to_thread(Negative.Save)
+        await asyncio.to_thread(Cache.Prune)
+
 if __name__ == '__main__':
     try:
         asyncio.run(Main())
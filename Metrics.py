@@ -0,0 +1,159 @@
+from typing import Callable, Dict, Tuple
+from collections import defaultdict
+from pathlib import Path
+from aiohttp import web
+import asyncio
+import time
+import os
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+def Labels(**Values) -> LabelSet:
+	return tuple(sorted((Name.lower(), str(Value)) for Name, Value in Values.items()))
+
+def Escape(Value: str) -> str:
+	return Value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def Format(Name: str, Labels: LabelSet, Value: float) -> str:
+	Rendered = ','.join(f'{Key}="{Escape(Item)}"' for Key, Item in Labels)
+	return f'{Name}{{{Rendered}}} {Value:g}' if Rendered else f'{Name} {Value:g}'
+
+class Metric:
+	Type = 'untyped'
+
+	def __init__(self, Name: str, Help: str) -> None:
+		self.Name = Name
+		self.Help = Help
+		self.Values: Dict[LabelSet, float] = defaultdict(float)
+
+	def Inc(self, Amount: float = 1.0, **Values) -> None:
+		self.Values[Labels(**Values)] += Amount
+
+	def Dec(self, Amount: float = 1.0, **Values) -> None:
+		self.Values[Labels(**Values)] -= Amount
+
+	def Set(self, Value: float, **Values) -> None:
+		self.Values[Labels(**Values)] = Value
+
+	def Get(self, **Values) -> float:
+		return self.Values.get(Labels(**Values), 0.0)
+
+	def Lines(self) -> list:
+		return [f'# HELP {self.Name} {self.Help}', f'# TYPE {self.Name} {self.Type}'] + [Format(self.Name, Key, Value) for Key, Value in list(self.Values.items())]
+
+class Counter(Metric):
+	Type = 'counter'
+
+class Gauge(Metric):
+	Type = 'gauge'
+
+class Histogram(Metric):
+	Type = 'histogram'
+	Buckets = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+	def __init__(self, Name: str, Help: str, Buckets: Tuple[float, ...] = None) -> None:
+		super().__init__(Name, Help)
+		self.Buckets = Buckets or self.Buckets
+		self.Counts: Dict[LabelSet, list] = {}
+		self.Sums: Dict[LabelSet, float] = defaultdict(float)
+
+	def Observe(self, Value: float, **Values) -> None:
+		Key = Labels(**Values)
+		Counts = self.Counts.setdefault(Key, [0] * (len(self.Buckets) + 1))
+		for Index, Bound in enumerate(self.Buckets):
+			if Value <= Bound:
+				Counts[Index] += 1
+				break
+		else:
+			Counts[-1] += 1
+		self.Sums[Key] += Value
+
+	def Lines(self) -> list:
+		Lines = [f'# HELP {self.Name} {self.Help}', f'# TYPE {self.Name} {self.Type}']
+		for Key, Counts in list(self.Counts.items()):
+			Total = 0
+			for Bound, Count in zip(self.Buckets + (float('inf'),), Counts):
+				Total += Count
+				Lines.append(Format(f'{self.Name}_bucket', Key + (('le', '+Inf' if Bound == float('inf') else f'{Bound:g}'),), Total))
+			Lines.append(Format(f'{self.Name}_sum', Key, self.Sums[Key]))
+			Lines.append(Format(f'{self.Name}_count', Key, Total))
+		return Lines
+
+class Registry:
+	def __init__(self) -> None:
+		self.Metrics: Dict[str, Metric] = {}
+		self.Collectors: list[Callable[[], None]] = []
+
+	def Register(self, Metric: Metric) -> Metric:
+		return self.Metrics.setdefault(Metric.Name, Metric)
+
+	def Counter(self, Name: str, Help: str) -> Counter:
+		return self.Register(Counter(Name, Help))
+
+	def Gauge(self, Name: str, Help: str) -> Gauge:
+		return self.Register(Gauge(Name, Help))
+
+	def Histogram(self, Name: str, Help: str, Buckets: Tuple[float, ...] = None) -> Histogram:
+		return self.Register(Histogram(Name, Help, Buckets))
+
+	def Collector(self, Function: Callable[[], None]) -> Callable[[], None]:
+		self.Collectors.append(Function)
+		return Function
+
+	def Render(self) -> str:
+		for Function in self.Collectors:
+			Function()
+		return '\n'.join(Line for Metric in self.Metrics.values() for Line in Metric.Lines()) + '\n'
+
+def Rate(Registry: Registry, Source: Metric, Name: str, Help: str) -> Gauge:
+	Target = Registry.Gauge(Name, Help)
+	Previous = {'Time': time.monotonic(), 'Values': {}}
+
+	@Registry.Collector
+	def Collect() -> None:
+		Now, Values = time.monotonic(), dict(Source.Values)
+		Elapsed = max(Now - Previous['Time'], 1e-9)
+		for Key, Value in Values.items():
+			Target.Values[Key] = (Value - Previous['Values'].get(Key, 0.0)) / Elapsed
+		Previous.update(Time=Now, Values=Values)
+
+	return Target
+
+class Timer:
+	def __init__(self, Histogram: Histogram, **Values) -> None:
+		self.Histogram = Histogram
+		self.Values = Values
+
+	def __enter__(self) -> 'Timer':
+		self.Start = time.perf_counter()
+		return self
+
+	def __exit__(self, *_) -> None:
+		self.Histogram.Observe(time.perf_counter() - self.Start, **self.Values)
+
+Default = Registry()
+
+async def Serve(Registry: Registry, Port: int, Host: str = '127.0.0.1') -> web.AppRunner:
+	async def Handler(Request: web.Request) -> web.Response:
+		return web.Response(text=Registry.Render(), content_type='text/plain', charset='utf-8')
+
+	Application = web.Application()
+	Application.router.add_get('/metrics', Handler)
+	Runner = web.AppRunner(Application, access_log=None)
+	await Runner.setup()
+	await web.TCPSite(Runner, Host, Port).start()
+	return Runner
+
+def Write(Text: str, Target: Path) -> None:
+	Target.parent.mkdir(parents=True, exist_ok=True)
+	Temporary = Target.with_name(f'.{Target.name}.tmp')
+	Temporary.write_text(Text, encoding='utf-8')
+	os.replace(Temporary, Target)
+
+async def Flush(Registry: Registry, Target: Path, Interval: float = 5.0) -> None:
+	try:
+		while True:
+			await asyncio.sleep(Interval)
+			await asyncio.to_thread(Write, Registry.Render(), Target)
+	finally:
+		Write(Registry.Render(), Target)
@@ -0,0 +1,278 @@
+from dataclasses import dataclass
+from typing import Tuple
+from Parser import Dumps
+from aiohttp import web
+import statistics
+import argparse
+import hashlib
+import asyncio
+import random
+import time
+
+Services = {
+	'coomer': ['onlyfans', 'fansly'],
+	'kemono': ['patreon', 'subscribestar', 'gumroad', 'fanbox']
+}
+Words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'art', 'sfm', 'blender', 'comic', 'animation']
+
+@dataclass
+class MockConfig:
+	Creators: int = 4
+	Posts: int = 100
+	Attachments: int = 2
+	MinSize: int = 64 * 1024
+	MaxSize: int = 512 * 1024
+	Latency: float = 0.0
+	Jitter: float = 0.0
+	Bandwidth: float = 0.0
+	ErrorRate: float = 0.0
+	TruncateRate: float = 0.0
+	Seed: int = 0
+
+def Percentile(Values: list, Percent: float) -> float:
+	if len(Values) < 2:
+		return Values[0] if Values else 0.0
+	return statistics.quantiles(Values, n=100, method='inclusive')[max(0, min(98, round(Percent) - 1))]
+
+def KemonoPost(Index: int, Creator: str, Service: str, File: str, Attachments: list) -> dict:
+	Generator = random.Random(f'{Service}/{Creator}/{Index}')
+	return {
+		'id': str(Index),
+		'user': Creator,
+		'service': Service,
+		'title': f'Post {Index}',
+		'content': '<p>' + ' '.join(Generator.choices(Words, k=400)) + '</p>',
+		'embed': {},
+		'shared_file': False,
+		'added': '2024-01-01T00:00:00',
+		'published': '2024-01-01T00:00:00',
+		'edited': None,
+		'file': {'name': File.rsplit('/', 1)[-1], 'path': File} if File else {},
+		'attachments': [{'name': Path.rsplit('/', 1)[-1], 'path': Path} for Path in Attachments],
+		'poll': None,
+		'captions': None,
+		'tags': Generator.choices(Words, k=12)
+	}
+
+def Rule34Post(Index: int, Base: str, Name: str) -> dict:
+	Generator = random.Random(Name)
+	return {
+		'preview_url': f'{Base}/thumbnails/1/thumbnail_{Name}',
+		'sample_url': f'{Base}/samples/1/sample_{Name}',
+		'file_url': f'{Base}/images/1/{Name}',
+		'directory': 1,
+		'hash': Name.split('.')[0],
+		'width': 1920,
+		'height': 1080,
+		'id': Index,
+		'image': Name,
+		'change': 1700000000,
+		'owner': 'bot',
+		'parent_id': 0,
+		'rating': 'explicit',
+		'sample': True,
+		'sample_height': 450,
+		'sample_width': 850,
+		'score': 42,
+		'tags': ' '.join(Generator.choices(Words, k=60)),
+		'source': '',
+		'status': 'active',
+		'has_notes': False,
+		'comment_count': 0
+	}
+
+def E621Post(Index: int, Base: str, Name: str, Size: int) -> dict:
+	Generator = random.Random(Name)
+	return {
+		'id': Index,
+		'created_at': '2024-01-01T00:00:00.000-05:00',
+		'file': {'width': 1920, 'height': 1080, 'ext': Name.split('.')[-1], 'size': Size, 'md5': Name.split('.')[0], 'url': f'{Base}/data/{Name[:2]}/{Name[2:4]}/{Name}'},
+		'preview': {'width': 150, 'height': 84, 'url': f'{Base}/data/preview/{Name[:2]}/{Name[2:4]}/{Name}'},
+		'sample': {'has': True, 'height': 475, 'width': 850, 'url': f'{Base}/data/sample/{Name[:2]}/{Name[2:4]}/{Name}', 'alternates': {}},
+		'score': {'up': 10, 'down': 0, 'total': 10},
+		'tags': {'general': Generator.choices(Words, k=40), 'artist': ['artist'], 'species': ['canine']},
+		'rating': 'e',
+		'fav_count': 12,
+		'description': ' '.join(Generator.choices(Words, k=200))
+	}
+
+class MockServer:
+	def __init__(self, Config: MockConfig) -> None:
+		self.Config = Config
+		self.Random = random.Random(Config.Seed)
+		self.Names = {}
+		self.Files = {}
+		self.Latencies = []
+		self.Requests = 0
+		self.Errors = 0
+		self.NotModified = 0
+		self.BytesSent = 0
+
+	def Content(self, Seed: str) -> bytes:
+		Generator = random.Random(f'{self.Config.Seed}/{Seed}')
+		Size = Generator.randint(self.Config.MinSize, self.Config.MaxSize)
+		Block = Generator.randbytes(min(Size, 65536))
+		return (Block * (Size // len(Block) + 1))[:Size]
+
+	def Register(self, Seed: str, Extension: str, Algorithm: str = 'sha256') -> str:
+		if Seed not in self.Names:
+			Content = self.Content(Seed)
+			self.Names[Seed] = f'{hashlib.new(Algorithm, Content).hexdigest()}{Extension}'
+			self.Files[self.Names[Seed]] = (Seed, len(Content))
+		return self.Names[Seed]
+
+	def KemonoPath(self, Seed: str, Extension: str) -> str:
+		Name = self.Register(Seed, Extension)
+		return f'/{Name[:2]}/{Name[2:4]}/{Name}'
+
+	def Creators(self, Site: str) -> list:
+		return [
+			{'id': f'{Site}{Index}', 'name': f'{Site} creator {Index}', 'service': Services[Site][Index % len(Services[Site])]}
+			for Index in range(self.Config.Creators)
+		]
+
+	async def Favorites(self, Request: web.Request) -> web.Response:
+		return web.Response(body=Dumps(self.Creators(Request.match_info['Site'])), content_type='application/json')
+
+	async def Posts(self, Request: web.Request) -> web.Response:
+		Site, Service, Creator = Request.match_info['Site'], Request.match_info['Service'], Request.match_info['Creator']
+		Offset = int(Request.query.get('o', 0))
+		Posts = [
+			KemonoPost(
+				Index, Creator, Service,
+				self.KemonoPath(f'{Site}/{Service}/{Creator}/{Index}', '.jpg'),
+				[self.KemonoPath(f'{Site}/{Service}/{Creator}/{Index}/{Number}', '.png') for Number in range(self.Config.Attachments)]
+			)
+			for Index in range(Offset, min(Offset + 50, self.Config.Posts))
+		]
+		return web.Response(body=Dumps(Posts), content_type='application/json')
+
+	async def Rule34(self, Request: web.Request) -> web.Response:
+		Tag, Limit, Page = Request.query.get('tags', ''), int(Request.query.get('limit', 1000)), int(Request.query.get('pid', 0))
+		Base = f'{Request.scheme}://{Request.host}/rule34'
+		Posts = [Rule34Post(Index, Base, self.Register(f'rule34/{Tag}/{Index}', '.jpeg', 'md5')) for Index in range(Page * Limit, min((Page + 1) * Limit, self.Config.Posts))]
+		return web.Response(body=Dumps(Posts).replace(b'/', b'\\/') if Posts else b'', content_type='application/json')
+
+	async def E621(self, Request: web.Request) -> web.Response:
+		Tag, Limit, Page = Request.query.get('tags', ''), int(Request.query.get('limit', 320)), int(Request.query.get('page', 1))
+		Base = f'{Request.scheme}://{Request.host}/e621'
+		Posts = []
+		for Index in range((Page - 1) * Limit, min(Page * Limit, self.Config.Posts)):
+			Name = self.Register(f'e621/{Tag}/{Index}', '.png', 'md5')
+			Posts.append(E621Post(Index, Base, Name, self.Files[Name][1]))
+		return web.Response(body=Dumps({'posts': Posts}), content_type='application/json')
+
+	async def File(self, Request: web.Request) -> web.StreamResponse:
+		if Request.match_info['Name'] not in self.Files:
+			raise web.HTTPNotFound()
+		Content = self.Content(self.Files[Request.match_info['Name']][0])
+		Response = web.StreamResponse(headers={'Content-Length': str(len(Content)), 'Content-Type': 'application/octet-stream'})
+		await Response.prepare(Request)
+		if Request.method == 'HEAD':
+			return Response
+		Limit = len(Content) // 2 if self.Random.random() < self.Config.TruncateRate else len(Content)
+		for Start in range(0, Limit, 65536):
+			Chunk = Content[Start:min(Start + 65536, Limit)]
+			await Response.write(Chunk)
+			self.BytesSent += len(Chunk)
+			if self.Config.Bandwidth:
+				await asyncio.sleep(len(Chunk) / self.Config.Bandwidth)
+		if Limit < len(Content):
+			raise ConnectionResetError('Injected Truncation')
+		await Response.write_eof()
+		return Response
+
+	def Snapshot(self, Reset: bool = False) -> dict:
+		Snapshot = {
+			'Requests': self.Requests,
+			'Errors': self.Errors,
+			'NotModified': self.NotModified,
+			'Bytes': self.BytesSent,
+			'P50': Percentile(self.Latencies, 50),
+			'P99': Percentile(self.Latencies, 99)
+		}
+		if Reset:
+			self.Requests, self.Errors, self.NotModified, self.BytesSent, self.Latencies = 0, 0, 0, 0, []
+		return Snapshot
+
+	async def Stats(self, Request: web.Request) -> web.Response:
+		return web.Response(body=Dumps(self.Snapshot('reset' in Request.query)), content_type='application/json')
+
+	@web.middleware
+	async def Middleware(self, Request: web.Request, handler) -> web.StreamResponse:
+		if Request.path.startswith('/__'):
+			return await handler(Request)
+		Start = time.perf_counter()
+		self.Requests += 1
+		try:
+			if self.Config.Latency or self.Config.Jitter:
+				await asyncio.sleep(self.Config.Latency + self.Random.uniform(0, self.Config.Jitter))
+			if self.Random.random() < self.Config.ErrorRate:
+				self.Errors += 1
+				return web.Response(status=self.Random.choice([429, 500, 502, 503]))
+			Response = await handler(Request)
+			if isinstance(Response, web.Response) and Response.status == 200 and Response.body:
+				Tag = f'"{hashlib.md5(Response.body).hexdigest()}"'
+				if Request.headers.get('If-None-Match') == Tag:
+					self.NotModified += 1
+					return web.Response(status=304, headers={'ETag': Tag})
+				Response.headers['ETag'] = Tag
+			return Response
+		finally:
+			self.Latencies.append(time.perf_counter() - Start)
+
+	def Application(self) -> web.Application:
+		Application = web.Application(middlewares=[self.Middleware])
+		Application.add_routes([
+			web.get('/__stats', self.Stats),
+			web.get('/{Site}/api/v1/account/favorites', self.Favorites),
+			web.get('/{Site}/api/v1/{Service}/user/{Creator}/posts', self.Posts),
+			web.get('/{Site}/api/v1/{Service}/user/{Creator}', self.Posts),
+			web.get('/rule34/index.php', self.Rule34),
+			web.get('/e621/posts.json', self.E621),
+			web.get('/{Site}/{Prefix:.*}/{Name}', self.File)
+		])
+		return Application
+
+def Environment(Base: str) -> dict:
+	return {
+		'COOMER_URL': f'{Base}/coomer',
+		'KEMONO_URL': f'{Base}/kemono',
+		'RULE34_URL': f'{Base}/rule34',
+		'E621_URL': f'{Base}/e621'
+	}
+
+def AddArguments(Parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+	Parser.add_argument('--creators', type=int, default=MockConfig.Creators, dest='Creators', help='Favorited creators per site')
+	Parser.add_argument('--posts', type=int, default=MockConfig.Posts, dest='Posts', help='Posts per creator or tag')
+	Parser.add_argument('--attachments', type=int, default=MockConfig.Attachments, dest='Attachments', help='Attachments per kemono/coomer post')
+	Parser.add_argument('--min-size', type=int, default=MockConfig.MinSize, dest='MinSize', help='Smallest file in bytes')
+	Parser.add_argument('--max-size', type=int, default=MockConfig.MaxSize, dest='MaxSize', help='Largest file in bytes')
+	Parser.add_argument('--latency', type=float, default=0.0, dest='Latency', help='Added latency per request in milliseconds')
+	Parser.add_argument('--jitter', type=float, default=0.0, dest='Jitter', help='Random extra latency in milliseconds')
+	Parser.add_argument('--bandwidth', type=float, default=0.0, dest='Bandwidth', help='Per-response bandwidth cap in MB/s')
+	Parser.add_argument('--error-rate', type=float, default=0.0, dest='ErrorRate', help='Fraction of requests answered with 429/5xx')
+	Parser.add_argument('--truncate-rate', type=float, default=0.0, dest='TruncateRate', help='Fraction of file responses cut off halfway')
+	Parser.add_argument('--seed', type=int, default=0, dest='Seed')
+	return Parser
+
+def ConfigFrom(Args: argparse.Namespace) -> MockConfig:
+	return MockConfig(
+		Creators=Args.Creators, Posts=Args.Posts, Attachments=Args.Attachments,
+		MinSize=Args.MinSize, MaxSize=Args.MaxSize,
+		Latency=Args.Latency / 1e3, Jitter=Args.Jitter / 1e3, Bandwidth=Args.Bandwidth * 1e6,
+		ErrorRate=Args.ErrorRate, TruncateRate=Args.TruncateRate, Seed=Args.Seed
+	)
+
+async def Serve(Server: MockServer, Host: str = '127.0.0.1', Port: int = 0) -> Tuple[web.AppRunner, str]:
+	Runner = web.AppRunner(Server.Application(), access_log=None)
+	await Runner.setup()
+	await web.TCPSite(Runner, Host, Port).start()
+	return Runner, f'http://{Host}:{Runner.addresses[0][1]}'
+
+if __name__ == '__main__':
+	Parser = AddArguments(argparse.ArgumentParser(description='Local stand-in for the coomer, kemono, rule34 and e621 APIs'))
+	Parser.add_argument('--host', default='127.0.0.1', dest='Host')
+	Parser.add_argument('--port', type=int, default=8080, dest='Port')
+	Args = Parser.parse_args()
+	web.run_app(MockServer(ConfigFrom(Args)).Application(), host=Args.Host, port=Args.Port, access_log=None, print=None)
@@ -0,0 +1,215 @@
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from typing import AsyncIterator, Deque, Dict, Tuple
+from collections import deque
+from Proxies import ProxyConnector
+import asyncio
+import aiohttp
+import time
+
+Unhealthy = (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError)
+States = ('closed', 'half-open', 'open')
+
+class CircuitOpen(Exception):
+	def __init__(self, Host: str, Remaining: float) -> None:
+		super().__init__(f'Circuit Open For {Host} ({Remaining:.0f}s Left)')
+		self.Host = Host
+		self.Remaining = Remaining
+
+class Breaker:
+	def __init__(self, Host: str, Window: float = 60.0, MinCalls: int = 10, ErrorRate: float = 0.5, SlowCall: float = 30.0, Cooldown: float = 15.0, MaxCooldown: float = 300.0) -> None:
+		self.Host = Host
+		self.Window = Window
+		self.MinCalls = MinCalls
+		self.ErrorRate = ErrorRate
+		self.SlowCall = SlowCall
+		self.Cooldown = Cooldown
+		self.MaxCooldown = MaxCooldown
+		self.State = 'closed'
+		self.Calls: Deque[Tuple[float, bool]] = deque()
+		self.Failures = 0
+		self.Until = 0.0
+		self.Trips = 0
+		self.Opened = 0
+		self.Probing = False
+
+	def Remaining(self) -> float:
+		return max(0.0, self.Until - time.monotonic()) if self.State == 'open' else 0.0
+
+	def Blocked(self) -> bool:
+		if self.State == 'open' and time.monotonic() >= self.Until:
+			self.State = 'half-open'
+		return self.State == 'open' or (self.State == 'half-open' and self.Probing)
+
+	def Allow(self) -> bool:
+		if self.Blocked():
+			return False
+		self.Probing = self.State == 'half-open'
+		return True
+
+	def Release(self) -> None:
+		if self.State == 'half-open':
+			self.Probing = False
+
+	def Record(self, Failed: bool, Latency: float) -> None:
+		Now = time.monotonic()
+		Failed = Failed or Latency > self.SlowCall
+		if self.State == 'half-open':
+			self.Probing = False
+			self.Trip(Now) if Failed else self.Close()
+		elif self.State == 'closed':
+			self.Calls.append((Now, Failed))
+			self.Failures += Failed
+			while Now - self.Calls[0][0] > self.Window:
+				self.Failures -= self.Calls.popleft()[1]
+			if len(self.Calls) >= self.MinCalls and self.Failures >= len(self.Calls) * self.ErrorRate:
+				self.Trip(Now)
+
+	def Trip(self, Now: float) -> None:
+		self.State = 'open'
+		self.Until = Now + min(self.Cooldown * 2 ** self.Trips, self.MaxCooldown)
+		self.Trips += 1
+		self.Opened += 1
+		self.Calls.clear()
+		self.Failures = 0
+
+	def Close(self) -> None:
+		self.State = 'closed'
+		self.Trips = 0
+
+class Pool:
+	def __init__(self, Lane: 'Lane', Proxy: str = '') -> None:
+		Options = dict(limit=Lane.Limit, limit_per_host=Lane.Limit, ssl=False, keepalive_timeout=Lane.Keepalive, enable_cleanup_closed=True)
+		self.Proxy = Proxy if Proxy.startswith('http') else None
+		self.Session = aiohttp.ClientSession(
+			connector=ProxyConnector.from_url(Proxy, rdns=True, **Options) if Proxy.startswith('socks') else aiohttp.TCPConnector(
+				use_dns_cache=True,
+				ttl_dns_cache=300,
+				**Options
+			),
+			timeout=Lane.Timeout,
+			trust_env=True,
+			raise_for_status=False
+		)
+		self.Created = self.Used = time.monotonic()
+		self.Active = 0
+		self.Failures = 0
+		self.Retired = False
+
+	async def Close(self) -> None:
+		if not self.Session.closed:
+			await self.Session.close()
+
+class Lane:
+	def __init__(self, Name: str, Limit: int, Timeout: aiohttp.ClientTimeout, Keepalive: float = 30.0, MaxAge: float = 900.0, IdleTimeout: float = 120.0, MaxFailures: int = 5, Breakers: Dict[str, Breaker] = None) -> None:
+		self.Name = Name
+		self.Limit = Limit
+		self.Timeout = Timeout
+		self.Keepalive = Keepalive
+		self.MaxAge = MaxAge
+		self.IdleTimeout = IdleTimeout
+		self.MaxFailures = MaxFailures
+		self.Pools: Dict[Tuple[str, str], Pool] = {}
+		self.Rotations = 0
+		self.Breakers = {} if Breakers is None else Breakers
+
+	def Circuit(self, Host: str) -> Breaker:
+		if Host not in self.Breakers:
+			self.Breakers[Host] = Breaker(Host)
+		return self.Breakers[Host]
+
+	def PoolFor(self, Key: Tuple[str, str]) -> Pool:
+		if Key not in self.Pools:
+			self.Pools[Key] = Pool(self, Key[1])
+		return self.Pools[Key]
+
+	async def Rotate(self, Key: Tuple[str, str]) -> None:
+		Old = self.Pools.pop(Key, None)
+		if Old:
+			Old.Retired = True
+			self.Rotations += 1
+			if not Old.Active:
+				await Old.Close()
+
+	@asynccontextmanager
+	async def Request(self, Method: str, Url: str, Proxy: str = '', **Options) -> AsyncIterator[aiohttp.ClientResponse]:
+		Key = (urlsplit(Url).hostname, Proxy)
+		Circuit = self.Circuit(Key[0])
+		if not Circuit.Allow():
+			raise CircuitOpen(Key[0], Circuit.Remaining())
+		Current = self.PoolFor(Key)
+		Current.Active += 1
+		Current.Used = time.monotonic()
+		Start = time.perf_counter()
+		Latency = Failed = None
+		try:
+			async with Current.Session.request(Method, Url, proxy=Current.Proxy, **Options) as Response:
+				Latency = time.perf_counter() - Start
+				Failed = Response.status >= 500 or Response.status == 429
+				Current.Failures = 0
+				yield Response
+		except Unhealthy:
+			Failed = True
+			Current.Failures += 1
+			if Current.Failures >= self.MaxFailures and self.Pools.get(Key) is Current:
+				await self.Rotate(Key)
+			raise
+		except aiohttp.ClientPayloadError:
+			Failed = True
+			raise
+		finally:
+			if Failed is None:
+				Circuit.Release()
+			else:
+				Circuit.Record(Failed, time.perf_counter() - Start if Latency is None else Latency)
+			Current.Active -= 1
+			if Current.Retired and not Current.Active:
+				await Current.Close()
+
+	def Get(self, Url: str, **Options):
+		return self.Request('GET', Url, **Options)
+
+	def Head(self, Url: str, **Options):
+		return self.Request('HEAD', Url, **Options)
+
+	async def Maintain(self) -> None:
+		Now = time.monotonic()
+		for Key, Current in list(self.Pools.items()):
+			if not Current.Active and Now - Current.Used > self.IdleTimeout:
+				del self.Pools[Key]
+				await Current.Close()
+			elif Now - Current.Created > self.MaxAge:
+				await self.Rotate(Key)
+
+	async def Close(self) -> None:
+		await asyncio.gather(*(Current.Close() for Current in self.Pools.values()), return_exceptions=True)
+		self.Pools.clear()
+
+class Network:
+	def __init__(self, ApiLimit: int = 4, MediaLimit: int = 16, ApiTimeout: float = 60.0, MediaTimeout: float = 300.0, MaxAge: float = 900.0, IdleTimeout: float = 120.0) -> None:
+		self.Breakers: Dict[str, Breaker] = {}
+		self.Api = Lane('api', ApiLimit, aiohttp.ClientTimeout(total=ApiTimeout, connect=30.0, sock_connect=30.0, sock_read=ApiTimeout), MaxAge=MaxAge, IdleTimeout=IdleTimeout, Breakers=self.Breakers)
+		self.Media = Lane('media', MediaLimit, aiohttp.ClientTimeout(total=MediaTimeout, connect=30.0, sock_connect=30.0, sock_read=MediaTimeout), MaxAge=MaxAge, IdleTimeout=IdleTimeout, Breakers=self.Breakers)
+		self.Maintainer = None
+
+	def Lanes(self) -> list[Lane]:
+		return [self.Api, self.Media]
+
+	async def Maintain(self, Interval: float = 30.0) -> None:
+		while True:
+			await asyncio.sleep(Interval)
+			for Lane in self.Lanes():
+				await Lane.Maintain()
+
+	async def Close(self) -> None:
+		if self.Maintainer:
+			self.Maintainer.cancel()
+			await asyncio.gather(self.Maintainer, return_exceptions=True)
+		await asyncio.gather(*(Lane.Close() for Lane in self.Lanes()))
+
+	async def __aenter__(self) -> 'Network':
+		self.Maintainer = asyncio.create_task(self.Maintain())
+		return self
+
+	async def __aexit__(self, *_) -> None:
+		await self.Close()
@@ -0,0 +1,73 @@
+from typing import Iterator, Tuple
+from Parser import Loads, Dumps, Buffer
+from pathlib import Path
+import tarfile
+import hashlib
+import os
+
+Prefix = 'Pack-'
+Block = tarfile.BLOCKSIZE
+
+def Padded(Size: int) -> int:
+	return (Size + Block - 1) // Block * Block
+
+def Indexed(Name: str) -> bool:
+	return Name.startswith(Prefix) and Name.endswith('.json')
+
+def Members(Index: Buffer) -> list[str]:
+	return list(Loads(Index).get('Files', {}))
+
+def Candidates(Directory: Path, Threshold: int) -> list[Tuple[Path, int]]:
+	Found = []
+	with os.scandir(Directory) as Entries:
+		for Entry in Entries:
+			if Entry.is_file(follow_symlinks=False) and not Entry.name.startswith((Prefix, '.')) and not Entry.name.endswith('.partial'):
+				Size = Entry.stat().st_size
+				if Size < Threshold:
+					Found.append((Path(Entry.path), Size))
+	return sorted(Found)
+
+def Bundles(Files: list[Tuple[Path, int]], Limit: int) -> Iterator[list[Tuple[Path, int]]]:
+	Current, Used = [], tarfile.RECORDSIZE
+	for File, Size in Files:
+		Cost = Block + Padded(Size)
+		if Current and Used + Cost > Limit:
+			yield Current
+			Current, Used = [], tarfile.RECORDSIZE
+		Current.append((File, Size))
+		Used += Cost
+	if Current:
+		yield Current
+
+def Bundle(Directory: Path, Files: list[Tuple[Path, int]]) -> Path:
+	Name = Prefix + hashlib.sha1(''.join(File.name for File, _ in Files).encode()).hexdigest()[:16]
+	Archive, Index = Directory / f'{Name}.tar', {}
+	Temporary = Archive.with_name(f'{Archive.name}.partial')
+	with tarfile.open(Temporary, 'w', format=tarfile.GNU_FORMAT) as Tar:
+		for File, _ in Files:
+			Info = Tar.gettarinfo(File, File.name)
+			Info.uid = Info.gid = 0
+			Info.uname = Info.gname = ''
+			with open(File, 'rb') as Input:
+				Tar.addfile(Info, Input)
+			Index[File.stem] = [Tar.offset - Padded(Info.size), Info.size, File.name]
+	os.replace(Temporary, Archive)
+	Target = Directory / f'{Name}.json'
+	Temporary = Target.with_name(f'{Target.name}.partial')
+	Temporary.write_bytes(Dumps({'Archive': Archive.name, 'Files': Index}))
+	os.replace(Temporary, Target)
+	for File, _ in Files:
+		File.unlink(missing_ok=True)
+	return Archive
+
+def Pack(Root: Path, Threshold: int = 8 << 20, Limit: int = 512 << 20, Minimum: int = 2) -> dict:
+	Totals = {'Archives': 0, 'Files': 0, 'Bytes': 0}
+	for Directory, _, _ in os.walk(Root):
+		for Files in Bundles(Candidates(Path(Directory), Threshold), Limit):
+			if len(Files) < Minimum:
+				continue
+			Bundle(Path(Directory), Files)
+			Totals['Archives'] += 1
+			Totals['Files'] += len(Files)
+			Totals['Bytes'] += sum(Size for _, Size in Files)
+	return Totals
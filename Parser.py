@@ -0,0 +1,56 @@
+from typing import Any, Union
+import orjson
+
+Buffer = Union[bytes, bytearray, memoryview, str]
+DecodeError = orjson.JSONDecodeError
+
+Whitespace = b' \t\r\n'
+Projections = {
+	'file_url': b'"file_url"'
+}
+
+def Loads(Raw: Buffer) -> Any:
+	return orjson.loads(Raw)
+
+def Dumps(Data: Any, Indent: bool = False) -> bytes:
+	return orjson.dumps(Data, default=str, option=orjson.OPT_INDENT_2 if Indent else 0)
+
+def Empty(Raw: Buffer) -> bool:
+	return Raw.strip() in (b'', b'[]', b'{}', '', '[]', '{}')
+
+def Skip(Raw: bytes, Index: int) -> int:
+	while Raw[Index] in Whitespace:
+		Index += 1
+	return Index
+
+def Value(Raw: bytes, Key: bytes, Start: int, End: int) -> int:
+	while (Index := Raw.find(Key, Start, End)) >= 0:
+		Start = Index + len(Key)
+		if Index and Raw[Index - 1] == 92:
+			continue
+		Colon = Start if Raw[Start] == 58 else Skip(Raw, Start)
+		if Raw[Colon] == 58:
+			return Colon + 1 if Raw[Colon + 1] == 34 else Skip(Raw, Colon + 1)
+	return -1
+
+def Closing(Raw: bytes, Index: int) -> int:
+	while (Index := Raw.find(b'"', Index)) >= 0:
+		Escapes = Index
+		while Raw[Escapes - 1] == 92:
+			Escapes -= 1
+		if (Index - Escapes) % 2 == 0:
+			return Index
+		Index += 1
+	return len(Raw)
+
+def Project(Raw: Buffer, Field: str) -> list[str]:
+	Raw = Raw.encode() if isinstance(Raw, str) else bytes(Raw)
+	Key, Results, Start = Projections[Field], [], 0
+	while (Start := Value(Raw, Key, Start, len(Raw))) >= 0:
+		if Raw[Start] == 34:
+			Close = Closing(Raw, Start + 1)
+			Results.append(Raw[Start + 1:Close])
+			Start = Close + 1
+		else:
+			Start += 1
+	return list(dict.fromkeys(orjson.loads(b'["' + b'","'.join(Results) + b'"]'))) if Results else []
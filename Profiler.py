@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from typing import Callable, Iterator, Optional
+from pathlib import Path
+from Parser import Dumps
+import statistics
+import threading
+import asyncio
+import time
+import traceback
+import gc
+import sys
+
+class Sampler(threading.Thread):
+	def __init__(self, Target: int, Interval: float = 0.005) -> None:
+		super().__init__(name='Sampler', daemon=True)
+		self.Target = Target
+		self.Interval = Interval
+		self.Stacks = Counter()
+		self.Halt = threading.Event()
+
+	@staticmethod
+	def Collapse(Frame) -> str:
+		Frames = []
+		while Frame is not None:
+			Frames.append(f'{Path(Frame.f_code.co_filename).name}:{Frame.f_code.co_name}:{Frame.f_lineno}')
+			Frame = Frame.f_back
+		return ';'.join(reversed(Frames))
+
+	def run(self) -> None:
+		while not self.Halt.wait(self.Interval):
+			Frame = sys._current_frames().get(self.Target)
+			if Frame is not None:
+				self.Stacks[self.Collapse(Frame)] += 1
+
+	def Stop(self) -> None:
+		self.Halt.set()
+		self.join()
+
+class Watchdog(threading.Thread):
+	def __init__(self, Loop: asyncio.AbstractEventLoop, Threshold: float, Report: Optional[Callable[[float, traceback.StackSummary], None]] = None) -> None:
+		super().__init__(name='Watchdog', daemon=True)
+		self.Loop = Loop
+		self.Threshold = Threshold
+		self.Interval = Threshold / 4
+		self.Report = Report
+		self.Target = threading.get_ident()
+		self.Stalls = Counter()
+		self.Halt = threading.Event()
+		self.Handle: Optional[asyncio.TimerHandle] = None
+		self.Tick()
+
+	def Tick(self) -> None:
+		self.Beat = time.monotonic()
+		self.Handle = self.Loop.call_later(self.Interval, self.Tick)
+
+	def run(self) -> None:
+		Reported = None
+		while not self.Halt.wait(self.Interval):
+			Beat = self.Beat
+			Lag = time.monotonic() - Beat - self.Interval
+			if Lag < self.Threshold or Beat == Reported:
+				continue
+			Frame = sys._current_frames().get(self.Target)
+			if Frame is None:
+				continue
+			Reported = Beat
+			self.Stalls[Sampler.Collapse(Frame)] += 1
+			if self.Report:
+				self.Report(Lag, traceback.extract_stack(Frame))
+
+	def Stop(self) -> None:
+		self.Halt.set()
+		if self.Handle:
+			self.Handle.cancel()
+		self.join()
+
+class Profiler:
+	def __init__(self, Enabled: bool = False, Directory: Path = Path('Data/Profile'), Interval: float = 0.0, Threshold: float = 0.0) -> None:
+		self.Enabled = Enabled
+		self.Directory = Directory
+		self.Interval = Interval
+		self.Threshold = Threshold
+		self.Watchdog: Optional[Watchdog] = None
+		self.Collections = Counter()
+		self.Pauses = []
+		self.Collecting = 0.0
+		self.Stages = {}
+		self.Spans = defaultdict(list)
+		self.Lags = []
+		self.Sampler: Optional[Sampler] = None
+		self.Monitor: Optional[asyncio.Task] = None
+		self.Started = time.perf_counter()
+
+	@contextmanager
+	def Stage(self, Name: str) -> Iterator[None]:
+		Wall, Cpu = time.perf_counter(), time.process_time()
+		try:
+			yield
+		finally:
+			Stage = self.Stages.setdefault(Name, {'Calls': 0, 'Wall': 0.0, 'Cpu': 0.0})
+			Stage['Calls'] += 1
+			Stage['Wall'] += time.perf_counter() - Wall
+			Stage['Cpu'] += time.process_time() - Cpu
+
+	@contextmanager
+	def Span(self, Name: str) -> Iterator[None]:
+		Start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.Spans[Name].append(time.perf_counter() - Start)
+
+	@staticmethod
+	def Latency(Samples: list[float]) -> dict:
+		Samples = sorted(Samples)
+		return {
+			'Calls': len(Samples),
+			'Total': sum(Samples),
+			'P50': Samples[len(Samples) // 2],
+			'P95': Samples[min(len(Samples) - 1, int(len(Samples) * .95))]
+		}
+
+	def Collect(self, Phase: str, Info: dict) -> None:
+		if Phase == 'start':
+			self.Collecting = time.perf_counter()
+		else:
+			self.Collections[Info['generation']] += 1
+			self.Pauses.append(time.perf_counter() - self.Collecting)
+
+	async def MonitorLag(self, Interval: float = 0.1) -> None:
+		Loop = asyncio.get_running_loop()
+		while True:
+			Expected = Loop.time() + Interval
+			await asyncio.sleep(Interval)
+			self.Lags.append(max(0.0, Loop.time() - Expected))
+
+	def Start(self, Report: Optional[Callable[[float, traceback.StackSummary], None]] = None) -> None:
+		if self.Threshold > 0:
+			self.Watchdog = Watchdog(asyncio.get_running_loop(), self.Threshold, Report)
+			self.Watchdog.start()
+		if not self.Enabled:
+			return
+		self.Started = time.perf_counter()
+		self.Monitor = asyncio.create_task(self.MonitorLag())
+		gc.callbacks.append(self.Collect)
+		if self.Interval > 0:
+			self.Sampler = Sampler(threading.get_ident(), self.Interval)
+			self.Sampler.start()
+
+	async def Stop(self) -> Optional[dict]:
+		if self.Watchdog:
+			self.Watchdog.Stop()
+		if not self.Enabled:
+			return None
+		if self.Monitor:
+			self.Monitor.cancel()
+			await asyncio.gather(self.Monitor, return_exceptions=True)
+		if self.Collect in gc.callbacks:
+			gc.callbacks.remove(self.Collect)
+		if self.Sampler:
+			self.Sampler.Stop()
+		return await asyncio.to_thread(self.Write)
+
+	def Summary(self) -> dict:
+		Lags = sorted(self.Lags)
+		return {
+			'Wall': time.perf_counter() - self.Started,
+			'Cpu': time.process_time(),
+			'Stages': self.Stages,
+			'Spans': {Name: self.Latency(Samples) for Name, Samples in self.Spans.items()},
+			'Lag': {
+				'Samples': len(Lags),
+				'Mean': statistics.fmean(Lags) if Lags else 0.0,
+				'P99': Lags[min(len(Lags) - 1, int(len(Lags) * .99))] if Lags else 0.0,
+				'Max': Lags[-1] if Lags else 0.0
+			},
+			'Gc': {
+				'Collections': {f'Gen{Generation}': Count for Generation, Count in sorted(self.Collections.items())},
+				'Total': sum(self.Pauses),
+				'Max': max(self.Pauses, default=0.0)
+			},
+			'Samples': sum(self.Sampler.Stacks.values()) if self.Sampler else 0,
+			'Stalls': {
+				'Count': sum(self.Watchdog.Stalls.values()) if self.Watchdog else 0,
+				'Top': [{'Count': Count, 'Stack': Stack.split(';')[-3:]} for Stack, Count in self.Watchdog.Stalls.most_common(20)] if self.Watchdog else []
+			}
+		}
+
+	def Write(self) -> dict:
+		self.Directory.mkdir(parents=True, exist_ok=True)
+		Summary = self.Summary()
+		(self.Directory / 'Report.json').write_bytes(Dumps(Summary, Indent=True))
+		if self.Sampler:
+			(self.Directory / 'Stacks.folded').write_text(''.join(f'{Stack} {Count}\n' for Stack, Count in self.Sampler.Stacks.most_common()), encoding='utf-8')
+		if self.Watchdog:
+			(self.Directory / 'Stalls.folded').write_text(''.join(f'{Stack} {Count}\n' for Stack, Count in self.Watchdog.Stalls.most_common()), encoding='utf-8')
+		return Summary
@@ -0,0 +1,128 @@
+from Writer import Mismatch
+from pathlib import Path
+import asyncio
+import aiohttp
+import random
+import time
+
+try:
+	from aiohttp_socks import ProxyConnector, ProxyError, ProxyConnectionError, ProxyTimeoutError
+	SocksErrors = (ProxyError, ProxyConnectionError, ProxyTimeoutError)
+except ImportError:
+	ProxyConnector = None
+	SocksErrors = ()
+
+Schemes = ('http', 'https', 'socks4', 'socks5')
+Failures = (Mismatch, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, aiohttp.ClientHttpProxyError, TimeoutError, *SocksErrors)
+
+class Proxy:
+	def __init__(self, Url: str = '') -> None:
+		self.Url = Url
+		self.Score = 0.0
+		self.Latency = 0.0
+		self.Samples = 0
+		self.Active = 0
+		self.Failures = 0
+		self.Ejections = 0
+		self.Until = 0.0
+
+	def Observe(self, Rate: float, Latency: float, Alpha: float) -> None:
+		self.Score = Rate if not self.Samples else Alpha * Rate + (1 - Alpha) * self.Score
+		self.Latency = Latency if not self.Samples else Alpha * Latency + (1 - Alpha) * self.Latency
+		self.Samples += 1
+		self.Failures = 0
+
+	def __repr__(self) -> str:
+		return self.Url or 'direct'
+
+class Lease:
+	def __init__(self, Pool: 'ProxyPool', Proxy: Proxy) -> None:
+		self.Pool = Pool
+		self.Proxy = Proxy
+		self.Bytes = 0
+		self.Latency = 0.0
+		self.Start = time.perf_counter()
+
+	def __enter__(self) -> 'Lease':
+		return self
+
+	def __exit__(self, Type, *_) -> None:
+		self.Pool.Release(self, Type is not None and issubclass(Type, Failures))
+
+class ProxyPool:
+	def __init__(self, Alpha: float = 0.3, Explore: float = 0.1, MaxFailures: int = 3, Cooldown: float = 60.0) -> None:
+		self.Alpha = Alpha
+		self.Explore = Explore
+		self.MaxFailures = MaxFailures
+		self.Cooldown = Cooldown
+		self.Direct = Proxy()
+		self.Proxies: list[Proxy] = [self.Direct]
+
+	@staticmethod
+	def Supported(Url: str) -> bool:
+		Scheme = Url.split('://', 1)[0]
+		return Scheme in Schemes and (Scheme.startswith('http') or ProxyConnector is not None)
+
+	def Load(self, Directory: Path = Path('proxies')) -> int:
+		Known = {Current.Url for Current in self.Proxies}
+		for File in sorted(Directory.glob('*.txt')):
+			for Line in File.read_text(encoding='utf-8').split():
+				if '://' not in Line:
+					Line = f'{File.stem}://{Line}'
+				if Line not in Known and self.Supported(Line):
+					Known.add(Line)
+					self.Proxies.append(Proxy(Line))
+		return len(self.Proxies) - 1
+
+	def Healthy(self) -> list[Proxy]:
+		Now = time.monotonic()
+		return [Current for Current in self.Proxies if Current.Until <= Now]
+
+	def Pick(self) -> Proxy:
+		Healthy = self.Healthy()
+		Fresh = [Current for Current in Healthy if not Current.Samples]
+		if Fresh and random.random() < self.Explore:
+			return random.choice(Fresh)
+		return max(Healthy, key=lambda Current: Current.Score / (Current.Active + 1))
+
+	def Lease(self, Direct: bool = False) -> Lease:
+		Choice = self.Direct if Direct else self.Pick()
+		Choice.Active += 1
+		return Lease(self, Choice)
+
+	def Release(self, Lease: Lease, Failed: bool) -> None:
+		Current = Lease.Proxy
+		Current.Active -= 1
+		if not Failed:
+			if Lease.Bytes:
+				Current.Observe(Lease.Bytes / max(time.perf_counter() - Lease.Start, 1e-6), Lease.Latency, self.Alpha)
+			return
+		Current.Score *= 1 - self.Alpha
+		Current.Failures += 1
+		if Current is not self.Direct and Current.Failures >= self.MaxFailures:
+			Current.Until = time.monotonic() + self.Cooldown * 2 ** Current.Ejections
+			Current.Ejections += 1
+			Current.Failures = 0
+
+	async def Probe(self, Lane, Url: str, Concurrency: int = 64, Timeout: float = 10.0) -> int:
+		Semaphore = asyncio.Semaphore(Concurrency)
+
+		async def Check(Current: Proxy) -> bool:
+			async with Semaphore:
+				try:
+					Start = time.perf_counter()
+					async with asyncio.timeout(Timeout), Lane.Get(Url, Proxy=Current.Url) as Response:
+						Response.raise_for_status()
+						Latency = time.perf_counter() - Start
+						Size = len(await Response.read())
+					Current.Observe(Size / max(time.perf_counter() - Start, 1e-6), Latency, self.Alpha)
+					return True
+				except Exception:
+					return Current is self.Direct
+
+		Results = await asyncio.gather(*(Check(Current) for Current in self.Proxies))
+		self.Proxies = sorted((Current for Current, Alive in zip(self.Proxies, Results) if Alive), key=lambda Current: Current.Score, reverse=True)
+		return len(self.Proxies) - 1
+
+	def Best(self, Count: int = 5) -> list[Proxy]:
+		return sorted(self.Healthy(), key=lambda Current: Current.Score, reverse=True)[:Count]
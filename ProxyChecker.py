@@ -1,7 +1,11 @@
 from rich.console import Console
-from proxybroker import Broker
+from Parser import Loads, Dumps
+from Proxies import ProxyConnector, Schemes
+from pathlib import Path
+import argparse
 import asyncio
 import aiohttp
+import time
 import os
 
 LOG_LEVEL = 0  # 0: Debug, 1: Info, 2: Warning, 3: Error, 4: Critical
@@ -46,72 +50,151 @@ class RichLogger:
 
 Logger = RichLogger()
 
-async def Show(Proxies, Limit):
-    Count = Limit
-    while True:
+Directory = Path('proxies')
+StateFile = Directory / 'Checked.json'
+
+Providers = {
+    'http': [
+        'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/http.txt',
+        'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/http.txt',
+        'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/http.txt',
+        'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/http/data.txt',
+        'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/http/http.txt',
+        'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/http.txt',
+        'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=http&timeout=1000'
+    ],
+    'socks4': [
+        'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/socks4.txt',
+        'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks4.txt',
+        'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/socks4.txt',
+        'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/socks4/data.txt',
+        'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/socks4/socks4.txt',
+        'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/socks4.txt',
+        'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks4&timeout=1000'
+    ],
+    'socks5': [
+        'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/socks5.txt',
+        'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks5.txt',
+        'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/socks5.txt',
+        'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/socks5/data.txt',
+        'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/socks5/socks5.txt',
+        'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/socks5.txt',
+        'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks5&timeout=1000'
+    ]
+}
+
+def ParseArguments():
+    Parser = argparse.ArgumentParser(description='Validate the proxy lists in proxies/')
+    Parser.add_argument('--scrape', action='store_true', dest='Scrape', help='Also pull fresh candidates from the public proxy lists')
+    Parser.add_argument('--target', default='https://coomer.su/favicon.ico', dest='Target', help='URL every proxy has to fetch to pass')
+    Parser.add_argument('--timeout', type=float, default=10.0, dest='Timeout', help='Seconds a proxy gets to fetch the target')
+    Parser.add_argument('--workers', type=int, dest='Workers', help='Concurrent checks, defaults to proxy_max_workers from config.json')
+    Parser.add_argument('--limit', type=int, default=500, dest='Limit', help='Keep only the fastest N working proxies')
+    Parser.add_argument('--max-age', type=float, default=6.0, dest='MaxAge', help='Hours a passed check stays valid before the proxy is checked again')
+    Parser.add_argument('--batch', type=int, default=250, dest='Batch', help='Rewrite the lists after every N checks')
+    return Parser.parse_args()
+
+def Existing():
+    Proxies = []
+    for File in sorted(Directory.glob('*.txt')):
+        for Line in File.read_text(encoding='utf-8').split():
+            Proxies.append(Line if '://' in Line else f'{File.stem}://{Line}')
+    return list(dict.fromkeys(Proxies))
+
+async def Scrape(Session):
+    async def Fetch(Scheme, Url):
         try:
-            Proxy = await Proxies.get()
-            if Proxy is None:
-                break
-
-            Count -= 1
-            Logger.Debug(f'∙ [{Limit - Count}/{Limit}] Found Proxy: {list(Proxy.types)[0].lower()}://{Proxy.host}:{Proxy.port}')
-            
-            os.makedirs('proxies', exist_ok=True)
-            with open(f'proxies/{list(Proxy.types)[0].lower()}.txt', 'a') as File:
-                File.write(f'{list(Proxy.types)[0].lower()}://{Proxy.host}:{Proxy.port}\n')
-            
+            async with Session.get(Url) as Response:
+                Text = await Response.text(errors='ignore')
+            return [f'{Scheme}://{Line.split("://")[-1]}' for Line in Text.split() if ':' in Line]
         except Exception as e:
-            Console().print_exception(max_frames=1)
-            Logger.Error(f'Error processing proxy: {e}')
+            Logger.Warning(f'Failed to scrape {Url}: {e}')
+            return []
 
-Limit = 500
+    Results = await asyncio.gather(*(Fetch(Scheme, Url) for Scheme, Urls in Providers.items() for Url in Urls))
+    return [Proxy for Result in Results for Proxy in Result]
 
-Logger.Info(f'Scraping {Limit} Proxies:')
+async def Check(Session, Proxy, Args):
+    Start = time.perf_counter()
+    try:
+        if Proxy.startswith('socks'):
+            async with aiohttp.ClientSession(connector=ProxyConnector.from_url(Proxy, rdns=True, ssl=False)) as Socks:
+                async with Socks.get(Args.Target, timeout=aiohttp.ClientTimeout(total=Args.Timeout)) as Response:
+                    Response.raise_for_status()
+                    await Response.read()
+        else:
+            async with Session.get(Args.Target, proxy=Proxy, timeout=aiohttp.ClientTimeout(total=Args.Timeout)) as Response:
+                Response.raise_for_status()
+                await Response.read()
+        return time.perf_counter() - Start
+    except Exception:
+        return None
 
-for ProxyType in ['http', 'https', 'socks5']:
-    FilePath = f'proxies/{ProxyType}.txt'
-    if os.path.exists(FilePath):
-        with open(FilePath, 'w') as File:
-            File.truncate()
+def Write(Checked, Pending, Limit):
+    Fastest = sorted(Checked, key=lambda Proxy: Checked[Proxy][1])[:Limit]
+    Lists = {Scheme: [] for Scheme in Schemes}
+    for Proxy in Fastest + Pending:
+        Lists[Proxy.split('://')[0]].append(Proxy.split('://')[1])
+    Directory.mkdir(exist_ok=True)
+    for Scheme, Proxies in Lists.items():
+        Target = Directory / f'{Scheme}.txt'
+        if Proxies or Target.exists():
+            Temporary = Target.with_name(f'.{Target.name}.tmp')
+            Temporary.write_text(''.join(f'{Scheme}://{Proxy}\n' for Proxy in Proxies), encoding='utf-8')
+            os.replace(Temporary, Target)
+    Temporary = StateFile.with_name(f'.{StateFile.name}.tmp')
+    Temporary.write_bytes(Dumps({Proxy: Checked[Proxy] for Proxy in Fastest}, Indent=True))
+    os.replace(Temporary, StateFile)
 
-Proxies = asyncio.Queue()
-Broker = Broker(
-    Proxies,
-    providers=[
-        'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/http.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/http.txt',
-            'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/http.txt',
-            'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/http/data.txt',
-            'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/http/http.txt',
-            'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/http.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/http.txt',
-            'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=http&timeout=1000',
-            'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/socks4.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks4.txt',
-            'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/socks4.txt',
-            'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/socks4/data.txt',
-            'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/socks4/socks4.txt',
-            'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/socks4.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks4.txt',
-            'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks4&timeout=1000',
-            'https://raw.githubusercontent.com/TheSpeedX/PROXY-List/refs/heads/master/socks5.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks5.txt',
-            'https://raw.githubusercontent.com/mmpx12/proxy-list/refs/heads/master/socks5.txt',
-            'https://raw.githubusercontent.com/proxifly/free-proxy-list/refs/heads/main/proxies/protocols/socks5/data.txt',
-            'https://raw.githubusercontent.com/officialputuid/KangProxy/refs/heads/KangProxy/socks5/socks5.txt',
-            'https://raw.githubusercontent.com/Zaeem20/FREE_PROXIES_LIST/refs/heads/master/socks5.txt',
-            'https://raw.githubusercontent.com/ErcinDedeoglu/proxies/refs/heads/main/proxies/socks5.txt',
-            'https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks5&timeout=1000'
-        ],
-    max_conn=200,
-    timeout=10,
-    max_tries=1,
-    )
-Tasks = asyncio.gather(
-    Broker.find(types=[('HTTP', ('Anonymous', 'High')), 'HTTPS', 'SOCKS5'], limit=Limit),
-    Show(Proxies, Limit)
-)
-
-Loop = asyncio.get_event_loop()
-Loop.run_until_complete(Tasks)
\ No newline at end of file
+async def Main(Args):
+    Workers = Args.Workers or Loads(Path('config.json').read_bytes()).get('proxy_max_workers', 125)
+    State = Loads(StateFile.read_bytes()) if StateFile.exists() else {}
+    Now = time.time()
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=Workers, force_close=True, ssl=False)) as Session:
+        Known = Existing()
+        Candidates = list(dict.fromkeys(Known + await Scrape(Session))) if Args.Scrape else Known
+        Scraped = len(Candidates) - len(Known)
+        Candidates = [Proxy for Proxy in Candidates if Proxy.split('://')[0] in Schemes]
+        Skipped = []
+        if ProxyConnector is None:
+            Logger.Warning('aiohttp-socks is not installed, SOCKS proxies are kept unchecked')
+            Skipped = [Proxy for Proxy in Known if Proxy.startswith('socks')]
+            Candidates = [Proxy for Proxy in Candidates if not Proxy.startswith('socks')]
+
+        Checked = {Proxy: State[Proxy] for Proxy in Candidates if Proxy in State and Now - State[Proxy][0] < Args.MaxAge * 3600}
+        Queue = [Proxy for Proxy in Candidates if Proxy not in Checked]
+        Queued = set(Queue)
+        Pending = dict.fromkeys(Proxy for Proxy in Known if Proxy in Queued)
+        Logger.Info(f'Checking {len(Queue)} Proxies ({len(Checked)} Still Fresh, {Scraped} Scraped) With {Workers} Workers Against {Args.Target}')
+
+        Semaphore = asyncio.Semaphore(Workers)
+
+        async def Limited(Proxy):
+            async with Semaphore:
+                return Proxy, await Check(Session, Proxy, Args)
+
+        Done = Dead = 0
+        Started = time.perf_counter()
+        try:
+            for Task in asyncio.as_completed([Limited(Proxy) for Proxy in Queue]):
+                Proxy, Latency = await Task
+                Pending.pop(Proxy, None)
+                Done += 1
+                if Latency is None:
+                    Dead += 1
+                else:
+                    Checked[Proxy] = [time.time(), Latency]
+                if Done % Args.Batch == 0:
+                    Write(Checked, list(Pending) + Skipped, Args.Limit)
+                    Logger.Debug(f'∙ [{Done}/{len(Queue)}] {len(Checked)} Working, {Dead} Dead ({Done / (time.perf_counter() - Started):.0f} Checks/s)')
+        finally:
+            Write(Checked, list(Pending) + Skipped, Args.Limit)
+
+    Fastest = sorted(Checked.items(), key=lambda Item: Item[1][1])[:3]
+    Logger.Info(f'{len(Checked)} Working Proxies, {Dead} Dead, Kept The Fastest {min(len(Checked), Args.Limit)}')
+    for Proxy, (_, Latency) in Fastest:
+        Logger.Info(f'∙ {Proxy} ({Latency * 1000:.0f} ms)')
+
+if __name__ == '__main__':
+    asyncio.run(Main(ParseArguments()))
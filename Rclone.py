@@ -0,0 +1,108 @@
+from rclone_python.utils import RcloneException
+from urllib.parse import quote
+from typing import Optional
+import subprocess
+import secrets
+import asyncio
+import aiohttp
+import socket
+import shutil
+import time
+
+def FreePort(Host: str = '127.0.0.1') -> int:
+	with socket.socket() as Probe:
+		Probe.bind((Host, 0))
+		return Probe.getsockname()[1]
+
+class Daemon:
+	def __init__(self, Executable: str = 'rclone', Limit: int = 8, Timeout: float = 600.0, Arguments: tuple = ()) -> None:
+		self.Executable = shutil.which(Executable) or Executable
+		self.Limit = Limit
+		self.Timeout = Timeout
+		self.Arguments = Arguments
+		self.Process: Optional[asyncio.subprocess.Process] = None
+		self.Session: Optional[aiohttp.ClientSession] = None
+		self.Calls = 0
+
+	async def Start(self, Wait: float = 15.0) -> 'Daemon':
+		Address = f'127.0.0.1:{FreePort()}'
+		User, Password = 'neofans', secrets.token_urlsafe(24)
+		self.Process = await asyncio.create_subprocess_exec(
+			self.Executable, 'rcd', f'--rc-addr={Address}', f'--rc-user={User}', f'--rc-pass={Password}', '--rc-serve', '--log-level=ERROR', *self.Arguments,
+			stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+		)
+		self.Session = aiohttp.ClientSession(
+			base_url=f'http://{Address}',
+			auth=aiohttp.BasicAuth(User, Password),
+			connector=aiohttp.TCPConnector(limit=self.Limit),
+			timeout=aiohttp.ClientTimeout(total=self.Timeout)
+		)
+		Deadline = time.monotonic() + Wait
+		while True:
+			if self.Process.returncode is not None:
+				await self.Close()
+				raise RcloneException('rclone rcd exited while starting', f'Exit code {self.Process.returncode}')
+			try:
+				await self.Call('rc/noop')
+				return self
+			except aiohttp.ClientConnectionError:
+				if time.monotonic() > Deadline:
+					await self.Close()
+					raise RcloneException('rclone rcd did not start', f'Nothing listening on {Address} after {Wait:.0f}s')
+				await asyncio.sleep(0.1)
+
+	async def Call(self, Method: str, **Parameters) -> dict:
+		self.Calls += 1
+		async with self.Session.post(f'/{Method}', json=Parameters) as Response:
+			Body = await Response.json(content_type=None) or {}
+			if Response.status != 200:
+				raise RcloneException(f'{Method} failed with {Response.status}', Body.get('error', ''))
+			return Body
+
+	async def Remotes(self) -> list[str]:
+		return [f'{Name}:' for Name in (await self.Call('config/listremotes')).get('remotes') or []]
+
+	async def List(self, Fs: str, Remote: str = '', **Options) -> list[dict]:
+		return (await self.Call('operations/list', fs=Fs, remote=Remote, opt=Options)).get('list') or []
+
+	async def Cat(self, Fs: str, Remote: str) -> bytes:
+		self.Calls += 1
+		async with self.Session.get(f'/{quote(f"[{Fs}]")}/{quote(Remote)}') as Response:
+			if Response.status != 200:
+				raise RcloneException(f'Reading {Fs}/{Remote} failed with {Response.status}', await Response.text())
+			return await Response.read()
+
+	async def Mkdir(self, Fs: str, Remote: str = '') -> None:
+		await self.Call('operations/mkdir', fs=Fs, remote=Remote)
+
+	async def CopyFile(self, SourceFs: str, Source: str, TargetFs: str, Target: str) -> None:
+		await self.Call('operations/copyfile', srcFs=SourceFs, srcRemote=Source, dstFs=TargetFs, dstRemote=Target)
+
+	async def MoveFile(self, SourceFs: str, Source: str, TargetFs: str, Target: str) -> None:
+		await self.Call('operations/movefile', srcFs=SourceFs, srcRemote=Source, dstFs=TargetFs, dstRemote=Target)
+
+	async def Copy(self, Source: str, Target: str, **Config) -> dict:
+		return await self.Call('sync/copy', srcFs=Source, dstFs=Target, **({'_config': Config} if Config else {}))
+
+	async def Move(self, Source: str, Target: str, DeleteEmpty: bool = False, **Config) -> dict:
+		return await self.Call('sync/move', srcFs=Source, dstFs=Target, deleteEmptySrcDirs=DeleteEmpty, **({'_config': Config} if Config else {}))
+
+	async def Close(self) -> None:
+		if self.Process and self.Process.returncode is None:
+			try:
+				await self.Call('core/quit')
+			except (aiohttp.ClientError, RcloneException):
+				pass
+			try:
+				await asyncio.wait_for(self.Process.wait(), 5)
+			except TimeoutError:
+				self.Process.kill()
+				await self.Process.wait()
+		if self.Session and not self.Session.closed:
+			await self.Session.close()
+
+	async def __aenter__(self) -> 'Daemon':
+		return await self.Start()
+
+	async def __aexit__(self, *_) -> None:
+		await self.Close()
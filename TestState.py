@@ -0,0 +1,59 @@
+from Fetcher import Fetcher, Downloader, FileData, CreateNetwork, InitLogging, Log, ErrorLogger, TempDir, FinalDir
+from Proxies import ProxyPool
+from Writer import Writer
+from aiohttp import web
+from pathlib import Path
+import unittest
+import tempfile
+import hashlib
+import os
+
+Payload = b'neofans' * 1024
+Digest = hashlib.sha256(Payload).hexdigest()
+Uploaded = hashlib.sha256(b'uploaded').hexdigest()
+
+class Remote:
+	async def Remotes(self) -> list[str]:
+		return ['Test:']
+
+	async def List(self, Path: str) -> list[dict]:
+		if Path.endswith('/Creator'):
+			return [{'Name': f'{Uploaded[:30]}.jpg'}]
+		return [{'Name': 'Creator'}] if Path.endswith('Kemono') else []
+
+	async def Cat(self, Fs: str, Name: str) -> bytes:
+		return b'{}'
+
+class TestState(unittest.IsolatedAsyncioTestCase):
+	async def asyncSetUp(self) -> None:
+		InitLogging()
+		self.Directory = tempfile.TemporaryDirectory(prefix='neofans-state-')
+		self.Previous = os.getcwd()
+		os.chdir(self.Directory.name)
+		App = web.Application()
+		App.router.add_get('/data/{Name}', lambda _: web.Response(body=Payload))
+		self.Runner = web.AppRunner(App)
+		await self.Runner.setup()
+		Site = web.TCPSite(self.Runner, '127.0.0.1', 0)
+		await Site.start()
+		self.Base = f'http://127.0.0.1:{self.Runner.addresses[0][1]}'
+
+	async def asyncTearDown(self) -> None:
+		await self.Runner.cleanup()
+		os.chdir(self.Previous)
+		self.Directory.cleanup()
+
+	async def testDownloadAfterLookupIsInState(self) -> None:
+		async with CreateNetwork() as Lanes, Writer(TempDir, FinalDir) as Disk:
+			Fetch = Fetcher(Lanes, Log, ErrorLogger, Caching=False, Rclone=Remote())
+			Fetch.Data = {'kemono': {**Fetch.Data['kemono'], 'Directory': {'patreon': 'Kemono'}}}
+			Download = Downloader(Lanes, Disk, ProxyPool(), Log, ErrorLogger, Fetch)
+			await Fetch.LookupHashes()
+			self.assertIn(Uploaded[:30], Fetch.Hashes)
+			Known = set(Fetch.Hashes)
+			File = FileData('1', 'Creator', f'{self.Base}/data/{Digest}.bin', Path('Data/Kemono/Creator'), Digest, '.bin', Platform='kemono')
+			self.assertEqual(await Download.Download(File), len(Payload))
+			self.assertEqual(Fetch.Hashes.difference(Known), {Digest})
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,235 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+from pathlib import Path
+import hashlib
+import asyncio
+import shutil
+import errno
+import os
+
+Alignment = 4096
+BufferSize = 4 << 20
+Algorithms = {64: 'sha256', 32: 'md5'}
+Flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+def Align(Size: int) -> int:
+	return max(Alignment, (Size + Alignment - 1) // Alignment * Alignment)
+
+def Preallocate(Fd: int, Length: int) -> bool:
+	if Length <= 0 or not hasattr(os, 'posix_fallocate'):
+		return False
+	try:
+		os.posix_fallocate(Fd, 0, Length)
+		return True
+	except OSError:
+		return False
+
+class Mismatch(Exception):
+	pass
+
+def Hasher(Expected: str):
+	Algorithm = Algorithms.get(len(Expected))
+	if not Algorithm or any(Character not in '0123456789abcdefABCDEF' for Character in Expected):
+		return None
+	return hashlib.new(Algorithm)
+
+def WriteAll(Fd: int, View: memoryview, Offset: int) -> int:
+	Written = 0
+	while Written < len(View):
+		if hasattr(os, 'pwrite'):
+			Written += os.pwrite(Fd, View[Written:], Offset + Written)
+		else:
+			Written += os.write(Fd, View[Written:])
+	return Written
+
+def Copy(Source: Path, Target: Path) -> int:
+	with open(Source, 'rb') as Input, open(Target, 'wb') as Output:
+		Remaining = os.fstat(Input.fileno()).st_size
+		Copied = 0
+		for Method in ('copy_file_range', 'sendfile'):
+			if not hasattr(os, Method):
+				continue
+			try:
+				while Remaining > 0:
+					if Method == 'copy_file_range':
+						Sent = os.copy_file_range(Input.fileno(), Output.fileno(), min(Remaining, 1 << 30))
+					else:
+						Sent = os.sendfile(Output.fileno(), Input.fileno(), Copied, min(Remaining, 1 << 30))
+					if not Sent:
+						break
+					Copied += Sent
+					Remaining -= Sent
+				return Copied
+			except OSError as Error:
+				if Copied or Error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+					raise
+		shutil.copyfileobj(Input, Output, BufferSize)
+		return Output.tell()
+
+def Link(Fd: int, Target: Path) -> None:
+	try:
+		os.link(f'/proc/self/fd/{Fd}', Target, follow_symlinks=True)
+	except FileExistsError:
+		Partial = Target.with_name(f'{Target.name}.partial')
+		Partial.unlink(missing_ok=True)
+		os.link(f'/proc/self/fd/{Fd}', Partial, follow_symlinks=True)
+		os.replace(Partial, Target)
+
+def Detect(Staging: Path, Final: Path) -> str:
+	Staging.mkdir(parents=True, exist_ok=True)
+	Final.mkdir(parents=True, exist_ok=True)
+	if hasattr(os, 'O_TMPFILE'):
+		Probe = Final / f'.probe-{os.getpid()}'
+		try:
+			Fd = os.open(Final, os.O_TMPFILE | os.O_WRONLY, 0o644)
+			try:
+				Link(Fd, Probe)
+			finally:
+				os.close(Fd)
+			Probe.unlink()
+			return 'tmpfile'
+		except OSError:
+			Probe.unlink(missing_ok=True)
+	return 'rename' if os.stat(Staging).st_dev == os.stat(Final).st_dev else 'partial'
+
+class Sink:
+	def __init__(self, Writer: 'Writer', Target: Path, Length: int = 0, Expected: str = '') -> None:
+		self.Writer = Writer
+		self.Target = Target
+		self.Length = Length
+		self.Expected = Expected.lower()
+		self.Digest = Hasher(Expected)
+		self.Path = {
+			'tmpfile': None,
+			'partial': Target.with_name(f'{Target.name}.partial'),
+			'rename': Writer.Staging / Target.relative_to(Writer.Final)
+		}[Writer.Placement]
+		self.Committed = False
+		self.Fd = -1
+		self.Offset = 0
+		self.Filled = 0
+		self.Buffer = Writer.Take()
+		self.Spare = Writer.Take()
+		self.Pending: Optional[asyncio.Future] = None
+		self.Preallocated = False
+
+	def Open(self) -> int:
+		if self.Path is None:
+			self.Fd = os.open(self.Target.parent, os.O_TMPFILE | os.O_WRONLY | os.O_CLOEXEC, 0o644)
+		else:
+			self.Fd = os.open(self.Path, Flags, 0o644)
+		self.Preallocated = Preallocate(self.Fd, self.Length)
+		return self.Fd
+
+	def Place(self) -> None:
+		if self.Path is None:
+			Link(self.Fd, self.Target)
+		else:
+			self.Writer.Relocate(self.Path, self.Target)
+
+	def Finish(self, Failed: bool) -> None:
+		try:
+			if self.Preallocated and self.Offset != self.Length:
+				os.ftruncate(self.Fd, self.Offset)
+			if not Failed:
+				try:
+					self.Place()
+				except FileNotFoundError:
+					self.Target.parent.mkdir(parents=True, exist_ok=True)
+					self.Place()
+		finally:
+			os.close(self.Fd)
+			if Failed and self.Path is not None:
+				self.Path.unlink(missing_ok=True)
+
+	async def Commit(self) -> None:
+		await self.Flush()
+		if self.Pending:
+			await self.Pending
+			self.Pending = None
+		if self.Digest and self.Digest.hexdigest() != self.Expected:
+			raise Mismatch(f'Expected {self.Expected[:30]}..., Got {self.Digest.hexdigest()[:30]}... After {self.Offset} Bytes')
+		self.Committed = True
+
+	async def __aenter__(self) -> 'Sink':
+		await self.Writer.Run(self.Open)
+		return self
+
+	async def Write(self, Chunk: bytes) -> None:
+		View = memoryview(Chunk)
+		while View:
+			Space = len(self.Buffer) - self.Filled
+			Taken = min(Space, len(View))
+			self.Buffer[self.Filled:self.Filled + Taken] = View[:Taken]
+			self.Filled += Taken
+			View = View[Taken:]
+			if self.Filled == len(self.Buffer):
+				await self.Flush()
+
+	async def Flush(self) -> None:
+		if self.Pending:
+			await self.Pending
+			self.Pending = None
+		if not self.Filled:
+			return
+		View = memoryview(self.Buffer)[:self.Filled]
+		Jobs = [self.Writer.Submit(WriteAll, self.Fd, View, self.Offset)] + ([self.Writer.Submit(self.Digest.update, View)] if self.Digest else [])
+		self.Pending = asyncio.gather(*map(asyncio.wrap_future, Jobs))
+		self.Offset += self.Filled
+		self.Buffer, self.Spare, self.Filled = self.Spare, self.Buffer, 0
+
+	async def __aexit__(self, Type, *_) -> None:
+		try:
+			if Type is None:
+				await self.Flush()
+			if self.Pending:
+				await asyncio.gather(self.Pending, return_exceptions=Type is not None)
+		finally:
+			if self.Fd >= 0:
+				await self.Writer.Run(self.Finish, Type is not None or not self.Committed)
+			self.Writer.Give(self.Buffer, self.Spare)
+
+class Writer:
+	def __init__(self, Staging: Path, Final: Path, Workers: int = 4, Size: int = BufferSize, Keep: int = 32) -> None:
+		self.Staging = Staging
+		self.Final = Final
+		self.Placement = 'rename'
+		self.Executor = ThreadPoolExecutor(Workers, thread_name_prefix='Writer')
+		self.Size = Align(Size)
+		self.Keep = Keep
+		self.Buffers: list[bytearray] = []
+
+	def Take(self) -> bytearray:
+		return self.Buffers.pop() if self.Buffers else bytearray(self.Size)
+
+	def Give(self, *Buffers: bytearray) -> None:
+		for Buffer in Buffers:
+			if len(self.Buffers) < self.Keep:
+				self.Buffers.append(Buffer)
+
+	def Submit(self, Function, *Arguments) -> Future:
+		return self.Executor.submit(Function, *Arguments)
+
+	async def Run(self, Function, *Arguments):
+		return await asyncio.wrap_future(self.Submit(Function, *Arguments))
+
+	def Open(self, Target: Path, Length: int = 0, Expected: str = '') -> Sink:
+		return Sink(self, Target, Length, Expected)
+
+	def Relocate(self, Source: Path, Target: Path) -> None:
+		try:
+			os.replace(Source, Target)
+		except OSError as Error:
+			if Error.errno != errno.EXDEV:
+				raise
+			Partial = Target.with_name(f'{Target.name}.partial')
+			Copy(Source, Partial)
+			os.replace(Partial, Target)
+			os.unlink(Source)
+
+	async def __aenter__(self) -> 'Writer':
+		self.Placement = await self.Run(Detect, self.Staging, self.Final)
+		return self
+
+	async def __aexit__(self, *_) -> None:
+		await asyncio.to_thread(self.Executor.shutdown, True)